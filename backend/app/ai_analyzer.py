@@ -1,16 +1,133 @@
 import google.generativeai as genai
+import asyncio
+import hashlib
 import json
 import re
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 import os
 from dotenv import load_dotenv
 
+from .cv_compactor import CVCompactor
+
 load_dotenv()
 
+class StreamingAnalysisParser:
+    """
+    Single-pass parser for the OVERALL_SCORE / SUMMARY / MATCHING_SKILLS /
+    MISSING_SKILLS / DETAILED_ANALYSIS response format.
+
+    feed() accepts arbitrary chunks of model output and returns the fields
+    that became available, so the score is known as soon as its line is
+    complete rather than after the whole response has been generated.
+    """
+
+    SECTIONS = ["OVERALL_SCORE", "SUMMARY", "MATCHING_SKILLS", "MISSING_SKILLS", "DETAILED_ANALYSIS"]
+    HEADER_PATTERN = re.compile(r'(' + '|'.join(SECTIONS) + r'):')
+    # Longest header plus colon; a header may be split across chunks
+    HEADER_LOOKBEHIND = max(len(name) for name in SECTIONS) + 1
+    SCORE_PATTERN = re.compile(r'\s*(\d+)(?=\D)')
+
+    def __init__(self):
+        self.buffer = ""
+        self.scan_pos = 0
+        self.current = None
+        self.current_start = 0
+        self.raw = {}
+        self.fields = {}
+        self.closed = False
+
+    def feed(self, chunk: str) -> Dict:
+        """Consume a chunk of output; returns newly parsed fields"""
+        self.buffer += chunk or ""
+        updates = {}
+
+        while True:
+            match = self.HEADER_PATTERN.search(self.buffer, self.scan_pos)
+            # Sections only ever advance, so prose can't reopen an earlier one
+            if match and (self.current is None or
+                          self.SECTIONS.index(match.group(1)) > self.SECTIONS.index(self.current)):
+                if self.current is not None:
+                    self._finish(self.buffer[self.current_start:match.start()], updates)
+                self.current = match.group(1)
+                self.current_start = match.end()
+                self.scan_pos = match.end()
+                continue
+            if match:
+                self.scan_pos = match.end()
+                continue
+            self.scan_pos = max(self.scan_pos, len(self.buffer) - self.HEADER_LOOKBEHIND)
+            break
+
+        # Publish the score once the number is terminated, before its section ends
+        if self.current == "OVERALL_SCORE" and "overall_score" not in self.fields:
+            score_match = self.SCORE_PATTERN.match(self.buffer, self.current_start)
+            if score_match:
+                self._publish("overall_score", float(score_match.group(1)), updates)
+
+        return updates
+
+    def close(self) -> Dict:
+        """Signal end of output; returns fields completed by it"""
+        updates = {}
+        if not self.closed and self.current is not None:
+            self._finish(self.buffer[self.current_start:], updates)
+        self.closed = True
+        return updates
+
+    def _publish(self, name: str, value, updates: Dict):
+        self.fields[name] = value
+        updates[name] = value
+
+    def _finish(self, text: str, updates: Dict):
+        name = self.current
+        self.raw[name] = text.strip()
+
+        if name == "OVERALL_SCORE":
+            score_match = re.match(r'(\d+)', self.raw[name])
+            if score_match and "overall_score" not in self.fields:
+                self._publish("overall_score", float(score_match.group(1)), updates)
+        elif name in ("MATCHING_SKILLS", "MISSING_SKILLS"):
+            skills = [skill.strip() for skill in self.raw[name].split(',') if skill.strip()]
+            self._publish(name.lower(), skills, updates)
+        else:
+            self._publish(name.lower(), self.raw[name], updates)
+
+    def result(self) -> Dict:
+        """Validated analysis; raises ValueError for incomplete or malformed output"""
+        try:
+            if "overall_score" not in self.fields or not all(name in self.raw for name in self.SECTIONS):
+                raise ValueError("Incomplete or malformed response from Gemini")
+            
+            overall_score = self.fields["overall_score"]
+            if not 0 <= overall_score <= 100:
+                raise ValueError("Score must be between 0 and 100")
+            
+            if not self.fields["summary"]:
+                raise ValueError("Summary cannot be empty")
+            
+            if not self.fields["detailed_analysis"]:
+                raise ValueError("Detailed analysis cannot be empty")
+            
+            return {
+                "overall_score": overall_score,
+                "summary": self.fields["summary"],
+                "matching_skills": self.fields["matching_skills"],
+                "missing_skills": self.fields["missing_skills"],
+                "detailed_analysis": self.fields["detailed_analysis"]
+            }
+        
+        except Exception as e:
+            raise ValueError(f"Failed to parse Gemini response: {str(e)}")
+
 class AIAnalyzer:
+    # Enough output for the OVERALL_SCORE line when pre-screening
+    SCORE_ONLY_MAX_TOKENS = 16
+
     def __init__(self):
         self.api_key = os.getenv("GEMINI_API_KEY")
         self.model_name = "models/gemini-1.5-flash"
+        self.max_concurrency = int(os.getenv("ANALYSIS_CONCURRENCY", "4"))
+        self.compactor = CVCompactor()
         self.is_configured = self._configure_gemini()
     
     def _configure_gemini(self) -> bool:
@@ -53,39 +170,37 @@ class AIAnalyzer:
     
     def _parse_gemini_response(self, response_text: str) -> Dict:
         """Parse structured response from Gemini"""
+        parser = StreamingAnalysisParser()
+        parser.feed(response_text)
+        parser.close()
+        try:
+            return parser.result()
+        except ValueError:
+            # The whole text is available, so sections out of the requested order can still be found
+            return self._parse_unordered_response(response_text)
+
+    @staticmethod
+    def _parse_unordered_response(response_text: str) -> Dict:
+        """Regex fallback for complete responses whose sections are out of order"""
         try:
-            # Extract components using regex
+            next_section = r'(?=(?:OVERALL_SCORE|SUMMARY|MATCHING_SKILLS|MISSING_SKILLS|DETAILED_ANALYSIS):|$)'
             score_match = re.search(r'OVERALL_SCORE:\s*(\d+)', response_text)
-            summary_match = re.search(r'SUMMARY:\s*(.+?)(?=MATCHING_SKILLS:|$)', response_text, re.DOTALL)
-            matching_match = re.search(r'MATCHING_SKILLS:\s*(.+?)(?=MISSING_SKILLS:|$)', response_text, re.DOTALL)
-            missing_match = re.search(r'MISSING_SKILLS:\s*(.+?)(?=DETAILED_ANALYSIS:|$)', response_text, re.DOTALL)
-            detailed_match = re.search(r'DETAILED_ANALYSIS:\s*(.+?)$', response_text, re.DOTALL)
+            summary_match = re.search(r'SUMMARY:\s*(.+?)' + next_section, response_text, re.DOTALL)
+            matching_match = re.search(r'MATCHING_SKILLS:\s*(.*?)' + next_section, response_text, re.DOTALL)
+            missing_match = re.search(r'MISSING_SKILLS:\s*(.*?)' + next_section, response_text, re.DOTALL)
+            detailed_match = re.search(r'DETAILED_ANALYSIS:\s*(.+?)' + next_section, response_text, re.DOTALL)
             
             if not all([score_match, summary_match, matching_match, missing_match, detailed_match]):
                 raise ValueError("Incomplete or malformed response from Gemini")
             
-            # Parse score
             overall_score = float(score_match.group(1))
             if not 0 <= overall_score <= 100:
                 raise ValueError("Score must be between 0 and 100")
             
-            # Parse summary
             summary = summary_match.group(1).strip()
             if not summary:
                 raise ValueError("Summary cannot be empty")
             
-            # Parse skills lists
-            matching_skills = []
-            if matching_match:
-                matching_text = matching_match.group(1).strip()
-                matching_skills = [skill.strip() for skill in matching_text.split(',') if skill.strip()]
-            
-            missing_skills = []
-            if missing_match:
-                missing_text = missing_match.group(1).strip()
-                missing_skills = [skill.strip() for skill in missing_text.split(',') if skill.strip()]
-            
-            # Parse detailed analysis
             detailed_analysis = detailed_match.group(1).strip()
             if not detailed_analysis:
                 raise ValueError("Detailed analysis cannot be empty")
@@ -93,14 +208,27 @@ class AIAnalyzer:
             return {
                 "overall_score": overall_score,
                 "summary": summary,
-                "matching_skills": matching_skills,
-                "missing_skills": missing_skills,
+                "matching_skills": [skill.strip() for skill in matching_match.group(1).split(',') if skill.strip()],
+                "missing_skills": [skill.strip() for skill in missing_match.group(1).split(',') if skill.strip()],
                 "detailed_analysis": detailed_analysis
             }
         
         except Exception as e:
             raise ValueError(f"Failed to parse Gemini response: {str(e)}")
     
+    def _raise_api_error(self, e: Exception):
+        """Translate Gemini client errors into user-facing messages"""
+        if "quota exceeded" in str(e).lower():
+            raise RuntimeError("Gemini API quota exceeded. Please try again later.")
+        elif "rate limit" in str(e).lower():
+            raise RuntimeError("Gemini API rate limit reached. Please try again in a few minutes.")
+        elif "invalid api key" in str(e).lower():
+            raise RuntimeError("Invalid Gemini API key. Please check your configuration.")
+        elif "not found" in str(e).lower() or "not supported" in str(e).lower():
+            raise RuntimeError(f"Model {self.model_name} is not available. Please check your model configuration.")
+        else:
+            raise RuntimeError(f"Error calling Gemini API: {str(e)}")
+    
     async def analyze_cv(self, job_description: str, job_requirements: List[str], cv_content: str) -> Dict:
         """Analyze CV against job description using Gemini AI"""
         
@@ -111,11 +239,12 @@ class AIAnalyzer:
             # Create model instance with full model name
             model = genai.GenerativeModel('models/gemini-1.5-flash')
             
-            # Generate prompt
+            # Generate prompt, keeping the CV within the token budget
+            cv_content = self.compactor.fit_to_budget(cv_content, job_requirements)
             prompt = self._create_analysis_prompt(job_description, job_requirements, cv_content)
             
-            # Get response from Gemini
-            response = model.generate_content(prompt)
+            # Get response from Gemini without blocking the event loop
+            response = await model.generate_content_async(prompt)
             
             if not response or not response.text:
                 raise RuntimeError("Empty response received from Gemini API")
@@ -123,42 +252,120 @@ class AIAnalyzer:
             return self._parse_gemini_response(response.text)
                 
         except Exception as e:
-            if "quota exceeded" in str(e).lower():
-                raise RuntimeError("Gemini API quota exceeded. Please try again later.")
-            elif "rate limit" in str(e).lower():
-                raise RuntimeError("Gemini API rate limit reached. Please try again in a few minutes.")
-            elif "invalid api key" in str(e).lower():
-                raise RuntimeError("Invalid Gemini API key. Please check your configuration.")
-            elif "not found" in str(e).lower() or "not supported" in str(e).lower():
-                raise RuntimeError(f"Model {self.model_name} is not available. Please check your model configuration.")
-            else:
-                raise RuntimeError(f"Error calling Gemini API: {str(e)}")
+            self._raise_api_error(e)
     
-    async def analyze_multiple_cvs(self, job_description: str, job_requirements: List[str], cv_data: List[Dict]) -> List[Dict]:
-        """Analyze multiple CVs against a job description"""
-        results = []
-        errors = []
+    async def analyze_cv_stream(self, job_description: str, job_requirements: List[str], cv_content: str,
+                                on_update: Optional[Callable[[Dict], Optional[bool]]] = None,
+                                score_only: bool = False) -> Dict:
+        """
+        Analyze a CV while the response streams in.
+
+        on_update is called with each batch of newly parsed fields (the score
+        first, then summary, skill lists and finally the detailed analysis);
+        returning True stops generation early. score_only caps the output
+        and stops as soon as the score is known, for cheap pre-screening.
+
+        Returns the full validated analysis with complete=True, or the fields
+        parsed so far with complete=False when stopped early.
+        """
+        if not self.is_configured:
+            raise RuntimeError("Gemini API is not configured. Please provide a valid API key.")
         
-        for cv in cv_data:
-            try:
-                analysis = await self.analyze_cv(job_description, job_requirements, cv['content'])
+        try:
+            model = genai.GenerativeModel(self.model_name)
+            cv_content = self.compactor.fit_to_budget(cv_content, job_requirements)
+            prompt = self._create_analysis_prompt(job_description, job_requirements, cv_content)
+            generation_config = {"max_output_tokens": self.SCORE_ONLY_MAX_TOKENS} if score_only else None
+            
+            response = await model.generate_content_async(prompt, stream=True, generation_config=generation_config)
+            parser = StreamingAnalysisParser()
+            stopped = False
+            
+            async for chunk in response:
+                updates = parser.feed(chunk.text)
+                if updates and on_update and on_update(updates):
+                    stopped = True
+                if score_only and "overall_score" in parser.fields:
+                    stopped = True
+                if stopped:
+                    break
+            
+            if not stopped:
+                updates = parser.close()
+                if updates and on_update:
+                    on_update(updates)
+                # A capped score-only reply can end right after the digits; the score is all it needs
+                if not score_only:
+                    result = parser.result()
+                    result["complete"] = True
+                    return result
+            
+            if score_only and "overall_score" not in parser.fields:
+                raise ValueError("Failed to parse Gemini response: no overall score found")
+            partial = dict(parser.fields)
+            partial["complete"] = False
+            return partial
+        
+        except Exception as e:
+            self._raise_api_error(e)
+    
+    @staticmethod
+    def _error_result(cv: Dict, error: Exception) -> Dict:
+        return {
+            'cv_id': cv['id'],
+            'cv_filename': cv['filename'],
+            'error': str(error),
+            'overall_score': 0,
+            'summary': f"Error analyzing CV: {str(error)}",
+            'matching_skills': [],
+            'missing_skills': [],
+            'detailed_analysis': "Analysis failed due to an error with the AI service."
+        }
+
+    async def _analyze_pairs(self, pairs: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        """
+        Analyze (job, cv) pairs through one bounded-concurrency pipeline.
+        Pairs with identical job text and CV content are only sent to the model once.
+        Returns one result per pair, in input order.
+        """
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        tasks = {}
+
+        async def run(job: Dict, cv: Dict) -> Dict:
+            async with semaphore:
+                return await self.analyze_cv(job['description'], job['requirements'], cv['content'])
+
+        keys = []
+        for job, cv in pairs:
+            key = (
+                job['description'],
+                tuple(job['requirements']),
+                hashlib.sha256(cv['content'].encode('utf-8')).hexdigest()
+            )
+            keys.append(key)
+            if key not in tasks:
+                tasks[key] = asyncio.ensure_future(run(job, cv))
+
+        outcomes = dict(zip(tasks.keys(), await asyncio.gather(*tasks.values(), return_exceptions=True)))
+
+        results = []
+        for (job, cv), key in zip(pairs, keys):
+            outcome = outcomes[key]
+            if isinstance(outcome, Exception):
+                results.append(self._error_result(cv, outcome))
+            else:
+                analysis = dict(outcome)
                 analysis['cv_id'] = cv['id']
                 analysis['cv_filename'] = cv['filename']
                 analysis['error'] = None
                 results.append(analysis)
-            except Exception as e:
-                error_result = {
-                    'cv_id': cv['id'],
-                    'cv_filename': cv['filename'],
-                    'error': str(e),
-                    'overall_score': 0,
-                    'summary': f"Error analyzing CV: {str(e)}",
-                    'matching_skills': [],
-                    'missing_skills': [],
-                    'detailed_analysis': "Analysis failed due to an error with the AI service."
-                }
-                results.append(error_result)
-                errors.append(str(e))
+        return results
+
+    async def analyze_multiple_cvs(self, job_description: str, job_requirements: List[str], cv_data: List[Dict]) -> List[Dict]:
+        """Analyze multiple CVs against a job description"""
+        job = {'description': job_description, 'requirements': job_requirements}
+        results = await self._analyze_pairs([(job, cv) for cv in cv_data])
+        errors = [result['error'] for result in results if result['error']]
         
         if len(errors) == len(cv_data):
             # If all CVs failed, raise an error
@@ -166,4 +373,25 @@ class AIAnalyzer:
         
         # Sort by score (highest first)
         results.sort(key=lambda x: x['overall_score'], reverse=True)
-        return results
\ No newline at end of file
+        return results
+
+    async def analyze_matrix(self, jobs: List[Dict], cv_data: List[Dict]) -> Dict[int, List[Dict]]:
+        """
+        Analyze every CV against every job in a single scheduled run
+        Returns: {job_id: results sorted by score (highest first)}
+        """
+        pairs = [(job, cv) for job in jobs for cv in cv_data]
+        results = await self._analyze_pairs(pairs)
+        errors = [result['error'] for result in results if result['error']]
+
+        if pairs and len(errors) == len(pairs):
+            raise RuntimeError(f"Failed to analyze all CV/job pairs. First error: {errors[0]}")
+
+        rankings = {job['id']: [] for job in jobs}
+        for (job, _), result in zip(pairs, results):
+            result['job_id'] = job['id']
+            rankings[job['id']].append(result)
+
+        for job_results in rankings.values():
+            job_results.sort(key=lambda x: x['overall_score'], reverse=True)
+        return rankings
@@ -0,0 +1,180 @@
+import argparse
+import glob
+import itertools
+import os
+import tempfile
+import time
+from typing import List, Tuple
+
+from sqlalchemy import Column, Integer, LargeBinary, MetaData, Table, Text, bindparam, create_engine, select, text
+
+from .compression import (
+    CompressedText, compress_text, decompress_text, is_compressed, register_dictionary,
+    train_dictionary, unregister_dictionary
+)
+from .database import (
+    COMPRESSED_COLUMNS, AnalysisResult, CompressionDictionary, CVFile, SessionLocal, create_tables, engine,
+    vacuum_database
+)
+
+SAMPLE_DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "sample_data")
+
+def migrate(batch_size: int = 500, recompress: bool = False):
+    """Compress existing rows in place (or re-encode all with the newest dictionary)"""
+    for table, column in COMPRESSED_COLUMNS:
+        rewritten = 0
+        last_id = 0
+        while True:
+            with engine.begin() as conn:
+                rows = conn.execute(text(
+                    f"SELECT id, {column} FROM {table} WHERE id > :last_id AND {column} IS NOT NULL "
+                    "ORDER BY id LIMIT :limit"
+                ), {"last_id": last_id, "limit": batch_size}).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                updates = [
+                    {"row_id": row.id, "value": compress_text(decompress_text(row[1]))}
+                    for row in rows if recompress or not is_compressed(row[1])
+                ]
+                if updates:
+                    conn.execute(
+                        text(f"UPDATE {table} SET {column} = :value WHERE id = :row_id")
+                        .bindparams(bindparam("value", type_=LargeBinary)),
+                        updates
+                    )
+                rewritten += len(updates)
+        print(f"{table}.{column}: {rewritten} rows rewritten")
+
+    vacuum_database()
+
+def _load_samples(limit: int) -> List[Tuple[str, str, str]]:
+    """(cv content, summary, detailed analysis) triples from the database, or sample_data CVs"""
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(CVFile.content, AnalysisResult.summary, AnalysisResult.detailed_analysis)
+            .join(AnalysisResult, AnalysisResult.cv_id == CVFile.id)
+            .limit(limit)
+            .all()
+        )
+        samples = [tuple(row) for row in rows]
+        if not samples:
+            samples = [(content, "", "") for (content,) in db.query(CVFile.content).limit(limit).all()]
+    finally:
+        db.close()
+
+    if not samples:
+        for path in sorted(glob.glob(os.path.join(SAMPLE_DATA_DIR, "*.txt"))):
+            with open(path, "r", encoding="utf-8") as f:
+                samples.append((f.read(), "", ""))
+    return samples
+
+def train(sample_size: int = 2000):
+    """Train a shared dictionary from stored text and make it active for new writes"""
+    samples = _load_samples(sample_size)
+    dictionary = train_dictionary(text for sample in samples for text in sample if text)
+    if not dictionary:
+        print("Not enough repeated text to train a dictionary")
+        return
+
+    db = SessionLocal()
+    try:
+        record = CompressionDictionary(data=dictionary)
+        db.add(record)
+        db.commit()
+        register_dictionary(record.id, dictionary)
+        print(f"Stored dictionary {record.id} ({len(dictionary)} bytes) from {len(samples)} samples")
+        print("Run 'migrate --recompress' to re-encode existing rows with it")
+    finally:
+        db.close()
+
+def benchmark(rows: int = 5000, reads: int = 3):
+    """Compare SQLite file size and read/write latency for plain, zlib and zlib+dictionary storage"""
+    samples = _load_samples(500)
+    print(f"Benchmarking {rows} rows built from {len(samples)} samples\n")
+    print(f"{'storage':<18}{'db size':>12}{'write s':>10}{'read s':>10}{'ratio':>8}")
+
+    dictionary = train_dictionary(text for sample in samples for text in sample if text)
+    # Benchmark-only id so the dictionary never clashes with stored ones
+    benchmark_dictionary_id = 2 ** 31 - 1
+    baseline_size = None
+
+    for label, column_type, use_dictionary in (
+        ("plain text", Text, False),
+        ("zlib", CompressedText, False),
+        ("zlib+dictionary", CompressedText, True),
+    ):
+        if use_dictionary:
+            if not dictionary:
+                continue
+            register_dictionary(benchmark_dictionary_id, dictionary)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            bench_engine = create_engine(f"sqlite:///{path}")
+            metadata = MetaData()
+            table = Table(
+                "bench", metadata,
+                Column("id", Integer, primary_key=True),
+                Column("content", column_type),
+                Column("summary", column_type),
+                Column("detailed_analysis", column_type),
+            )
+            metadata.create_all(bench_engine)
+
+            data = [
+                {"content": content, "summary": summary, "detailed_analysis": detailed}
+                for content, summary, detailed in itertools.islice(itertools.cycle(samples), rows)
+            ]
+            start = time.perf_counter()
+            with bench_engine.begin() as conn:
+                for offset in range(0, rows, 500):
+                    conn.execute(table.insert(), data[offset:offset + 500])
+            write_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(reads):
+                with bench_engine.connect() as conn:
+                    for _row in conn.execute(select(table)):
+                        pass
+            read_seconds = (time.perf_counter() - start) / reads
+
+            bench_engine.dispose()
+            size = os.path.getsize(path)
+
+        if use_dictionary:
+            unregister_dictionary(benchmark_dictionary_id)
+
+        baseline_size = baseline_size or size
+        print(f"{label:<18}{size / 1024 / 1024:>10.2f}MB{write_seconds:>10.3f}{read_seconds:>10.3f}"
+              f"{baseline_size / size:>7.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage compressed storage of CV text and analysis prose")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="Compress existing uncompressed rows")
+    migrate_parser.add_argument("--batch-size", type=int, default=500)
+    migrate_parser.add_argument("--recompress", action="store_true",
+                                help="Re-encode every row with the newest dictionary")
+
+    train_parser = commands.add_parser("train", help="Train and store a shared compression dictionary")
+    train_parser.add_argument("--samples", type=int, default=2000)
+
+    benchmark_parser = commands.add_parser("benchmark", help="Compare size and latency with and without compression")
+    benchmark_parser.add_argument("--rows", type=int, default=5000)
+
+    args = parser.parse_args()
+    create_tables()
+
+    if args.command == "migrate":
+        migrate(batch_size=args.batch_size, recompress=args.recompress)
+    elif args.command == "train":
+        train(sample_size=args.samples)
+    else:
+        benchmark(rows=args.rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import os
+import time
+import zlib
+from collections import Counter
+from typing import Callable, Dict, Iterable, Optional
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+# Every stored value starts with a one-byte format marker. Rows written before
+# compression existed have no marker: SQLite returns them as str and
+# PostgreSQL's TEXT -> BYTEA migration leaves plain UTF-8, whose first byte is
+# never one of these control characters.
+FORMAT_RAW = b"\x00"
+FORMAT_ZLIB = b"\x01"
+FORMAT_ZLIB_DICT = b"\x02"
+
+# Values shorter than this aren't worth the zlib header
+MIN_COMPRESS_SIZE = 128
+# zlib's preset dictionary window
+MAX_DICTIONARY_SIZE = 32 * 1024
+
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))
+
+# How often writers check storage for a newer dictionary trained by another process
+DICTIONARY_REFRESH_SECONDS = float(os.getenv("COMPRESSION_DICTIONARY_REFRESH_SECONDS", "60"))
+
+# Shared dictionaries by id; new values use the highest registered id
+_dictionaries: Dict[int, bytes] = {}
+
+# Storage callbacks set by the database layer: load one dictionary by id, and find the newest id
+_load_dictionary: Optional[Callable[[int], Optional[bytes]]] = None
+_latest_dictionary_id: Optional[Callable[[], Optional[int]]] = None
+_next_refresh = 0.0
+
+def register_dictionary(dictionary_id: int, data: bytes):
+    _dictionaries[dictionary_id] = bytes(data)
+
+def unregister_dictionary(dictionary_id: int):
+    _dictionaries.pop(dictionary_id, None)
+
+def set_dictionary_source(load: Callable[[int], Optional[bytes]], latest_id: Callable[[], Optional[int]]):
+    """Let dictionaries stored after startup (e.g. by the train CLI) be loaded on demand"""
+    global _load_dictionary, _latest_dictionary_id
+    _load_dictionary = load
+    _latest_dictionary_id = latest_id
+
+def _ensure_dictionary(dictionary_id: int) -> bool:
+    if dictionary_id not in _dictionaries and _load_dictionary is not None:
+        data = _load_dictionary(dictionary_id)
+        if data is not None:
+            register_dictionary(dictionary_id, data)
+    return dictionary_id in _dictionaries
+
+def active_dictionary_id() -> Optional[int]:
+    global _next_refresh
+    if _latest_dictionary_id is not None and time.monotonic() >= _next_refresh:
+        _next_refresh = time.monotonic() + DICTIONARY_REFRESH_SECONDS
+        latest = _latest_dictionary_id()
+        if latest is not None:
+            _ensure_dictionary(latest)
+    return max(_dictionaries) if _dictionaries else None
+
+def compress_text(value: str) -> bytes:
+    data = value.encode("utf-8")
+    if len(data) < MIN_COMPRESS_SIZE:
+        return FORMAT_RAW + data
+
+    dictionary_id = active_dictionary_id()
+    if dictionary_id is None:
+        compressed = FORMAT_ZLIB + zlib.compress(data, COMPRESSION_LEVEL)
+    else:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=_dictionaries[dictionary_id])
+        compressed = (FORMAT_ZLIB_DICT + dictionary_id.to_bytes(4, "big") +
+                      compressor.compress(data) + compressor.flush())
+
+    # Incompressible text is cheaper to store as is
+    return compressed if len(compressed) < len(data) + 1 else FORMAT_RAW + data
+
+def decompress_text(value) -> str:
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    if not value:
+        return ""
+
+    marker, payload = value[:1], value[1:]
+    if marker == FORMAT_RAW:
+        return payload.decode("utf-8")
+    if marker == FORMAT_ZLIB:
+        return zlib.decompress(payload).decode("utf-8")
+    if marker == FORMAT_ZLIB_DICT:
+        dictionary_id = int.from_bytes(payload[:4], "big")
+        if not _ensure_dictionary(dictionary_id):
+            raise LookupError(f"Compression dictionary {dictionary_id} is not loaded")
+        decompressor = zlib.decompressobj(zdict=_dictionaries[dictionary_id])
+        return (decompressor.decompress(payload[4:]) + decompressor.flush()).decode("utf-8")
+
+    # Legacy uncompressed UTF-8
+    return value.decode("utf-8")
+
+def is_compressed(value) -> bool:
+    """True if a stored value is already in the marked format"""
+    return isinstance(value, (bytes, memoryview)) and bytes(value[:1]) in (FORMAT_RAW, FORMAT_ZLIB, FORMAT_ZLIB_DICT)
+
+def train_dictionary(samples: Iterable[str], size: int = MAX_DICTIONARY_SIZE) -> bytes:
+    """
+    Build a zlib preset dictionary from phrases that recur across samples.
+
+    Word n-grams are ranked by how many bytes they would save (frequency x
+    length). The most valuable phrases go last, because zlib finds matches
+    near the end of the dictionary with the shortest back-references.
+    """
+    counts = Counter()
+    for sample in samples:
+        words = sample.split()
+        for n in (8, 4, 2):
+            for i in range(len(words) - n + 1):
+                counts[" ".join(words[i:i + n])] += 1
+
+    chosen = []
+    chosen_text = ""
+    total = 0
+    # Phrases seen only once can't save anything
+    repeated = [(phrase, count) for phrase, count in counts.items() if count > 1]
+    for phrase, count in sorted(repeated, key=lambda item: item[1] * len(item[0]), reverse=True):
+        if total >= size - 16:
+            break
+        # n-grams inside an already chosen phrase add nothing
+        if phrase in chosen_text:
+            continue
+        encoded = (phrase + " ").encode("utf-8")
+        if total + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        chosen_text += phrase + "\n"
+        total += len(encoded)
+
+    return b"".join(reversed(chosen))
+
+class CompressedText(TypeDecorator):
+    """Text column stored zlib-compressed; the ORM still reads and writes str."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress_text(value)
@@ -0,0 +1,189 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import List
+
+class CVCompactor:
+    """
+    Shrinks extracted CV text before it is sent to the model.
+
+    compact() is job-independent (whitespace, page headers/footers,
+    duplicate sections) and its result is cached on CVFile. fit_to_budget()
+    then trims per job, keeping the sections most relevant to the job
+    requirements when the CV is over the token budget.
+    """
+
+    # Rough chars-per-token ratio for English prose; avoids a tokenizer round trip
+    CHARS_PER_TOKEN = 4
+    MAX_FURNITURE_LINE_LENGTH = 100
+    # Lines at each end of a page that may be running headers or footers
+    PAGE_EDGE_LINES = 3
+    MAX_HEADING_LENGTH = 40
+    SECTION_HEADINGS = {
+        'summary', 'profile', 'objective', 'experience', 'work experience', 'professional experience',
+        'employment', 'employment history', 'education', 'skills', 'technical skills', 'projects',
+        'certifications', 'languages', 'publications', 'awards', 'interests', 'references',
+    }
+    PAGE_NUMBER_PATTERN = re.compile(r'^(page\s*)?\d{1,3}(\s*(/|of)\s*\d{1,3})?$|^-\s*\d{1,3}\s*-$', re.IGNORECASE)
+    BULLET_PREFIXES = ('-', '•', '*', '·', '–')
+
+    def __init__(self, token_budget: int = None):
+        self.token_budget = token_budget or int(os.getenv("CV_TOKEN_BUDGET", "3000"))
+
+    @classmethod
+    def estimate_tokens(cls, text: str) -> int:
+        return math.ceil(len(text) / cls.CHARS_PER_TOKEN)
+
+    @staticmethod
+    def normalize_whitespace(text: str) -> str:
+        """Collapse runs of spaces and blank lines, strip every line"""
+        text = text.replace('\r\n', '\n').replace('\r', '\n').replace('\f', '\n')
+        lines = [re.sub(r'[ \t\u00a0]+', ' ', line).strip() for line in text.split('\n')]
+        return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+
+    @classmethod
+    def remove_repeated_lines(cls, text: str) -> str:
+        """
+        Drop page furniture: page numbers and lines that recur at the top or
+        bottom of most pages, such as the running headers and footers PDF
+        extraction repeats. Pages are separated by form feeds; repeated lines
+        elsewhere (e.g. the same job title in two roles) are content and kept.
+        """
+        pages = [page.split('\n') for page in text.split('\f')]
+
+        def key(line: str) -> str:
+            # "Page 2 of 5" and "Page 3 of 5" are the same footer
+            return re.sub(r'\d+', '#', re.sub(r'\s+', ' ', line).strip().lower())
+
+        def edge_lines(lines: List[str]) -> List[int]:
+            content = [i for i, line in enumerate(lines) if line.strip()]
+            edge = content[:cls.PAGE_EDGE_LINES] + content[-cls.PAGE_EDGE_LINES:]
+            return [i for i in dict.fromkeys(edge) if len(lines[i].strip()) <= cls.MAX_FURNITURE_LINE_LENGTH]
+
+        counts = Counter()
+        for lines in pages:
+            counts.update({key(lines[i]) for i in edge_lines(lines)})
+        min_pages = max(2, math.ceil(len(pages) / 2))
+
+        kept_pages = []
+        for lines in pages:
+            dropped = {
+                i for i in edge_lines(lines)
+                if cls.PAGE_NUMBER_PATTERN.match(lines[i].strip()) or counts[key(lines[i])] >= min_pages
+            }
+            kept_pages.append('\n'.join(line for i, line in enumerate(lines) if i not in dropped))
+        return '\n'.join(kept_pages)
+
+    @classmethod
+    def split_sections(cls, text: str) -> List[str]:
+        """Split on blank lines and before headings, since PDF text often has no blank lines"""
+        sections = []
+        for block in text.split('\n\n'):
+            current = []
+            for line in block.split('\n'):
+                if current and cls.is_heading(line):
+                    sections.append('\n'.join(current))
+                    current = []
+                current.append(line)
+            sections.append('\n'.join(current))
+        return [section for section in sections if section.strip()]
+
+    @classmethod
+    def is_heading(cls, line: str) -> bool:
+        line = line.strip()
+        if not line or len(line) > cls.MAX_HEADING_LENGTH or line.startswith(cls.BULLET_PREFIXES):
+            return False
+        letters = [char for char in line if char.isalpha()]
+        return (
+            line.endswith(':')
+            or (len(letters) > 1 and all(char.isupper() for char in letters))
+            or line.lower().rstrip(':') in cls.SECTION_HEADINGS
+        )
+
+    @classmethod
+    def deduplicate_sections(cls, text: str) -> str:
+        """Drop sections (see split_sections) that repeat an earlier one"""
+        seen = set()
+        kept = []
+        for section in cls.split_sections(text):
+            key = re.sub(r'\W+', '', section.lower())
+            if key in seen:
+                continue
+            seen.add(key)
+            kept.append(section)
+        return '\n\n'.join(kept)
+
+    @classmethod
+    def compact(cls, text: str) -> str:
+        """Job-independent compaction of extracted CV text"""
+        # Page breaks (form feeds) must survive until page furniture is removed
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+        text = cls.remove_repeated_lines(text)
+        text = cls.normalize_whitespace(text)
+        return cls.deduplicate_sections(text)
+
+    @classmethod
+    def cache_on(cls, cv) -> str:
+        """Fill a CVFile's cached compaction if missing (caller commits); returns the compacted text"""
+        if cv.compacted_content is None:
+            cv.compacted_content = cls.compact(cv.content)
+            cv.token_count = cls.estimate_tokens(cv.content)
+            cv.compacted_token_count = cls.estimate_tokens(cv.compacted_content)
+        return cv.compacted_content
+
+    def fit_to_budget(self, text: str, job_requirements: List[str]) -> str:
+        """
+        Trim text to the token budget. The first section (name and contact
+        details) is always kept; the rest are kept in order of how many job
+        requirements they mention, then re-assembled in their original order.
+        """
+        if self.estimate_tokens(text) <= self.token_budget:
+            return text
+
+        sections = self.split_sections(text)
+        separator = '\n\n'
+        if len(sections) == 1:
+            # No structure to rank; rank lines instead
+            sections = [line for line in text.split('\n') if line.strip()]
+            separator = '\n'
+        requirements = [req.lower() for req in job_requirements if req.strip()]
+
+        def relevance(index: int) -> int:
+            section = sections[index].lower()
+            return sum(1 for req in requirements if req in section)
+
+        priority = [0] + sorted(range(1, len(sections)), key=lambda i: (-relevance(i), i))
+
+        kept = {}
+        remaining = self.token_budget
+        for index in priority:
+            section = sections[index]
+            cost = self.estimate_tokens(section) + 1
+            if cost <= remaining:
+                kept[index] = section
+                remaining -= cost
+                continue
+
+            # Keep as many whole lines of an oversized section as still fit, then
+            # cut the first line that doesn't at a word boundary
+            lines = []
+            for line in section.split('\n'):
+                line_cost = self.estimate_tokens(line) + 1
+                if line_cost > remaining:
+                    if remaining > 1:
+                        cut = line[:(remaining - 1) * self.CHARS_PER_TOKEN]
+                        cut = cut.rsplit(' ', 1)[0] if ' ' in cut else cut
+                        if cut.strip():
+                            lines.append(cut)
+                    remaining = 0
+                    break
+                lines.append(line)
+                remaining -= line_cost
+            # A heading without any of its content is just noise in the prompt
+            if lines and not all(self.is_heading(line) or not line.strip() for line in lines):
+                kept[index] = '\n'.join(lines)
+            if remaining <= 0:
+                break
+
+        return separator.join(kept[index] for index in sorted(kept))
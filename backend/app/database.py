@@ -1,9 +1,12 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean, Float, ForeignKey, JSON
+from sqlalchemy import create_engine, inspect, text, Column, Index, Integer, String, DateTime, Text, Boolean, Float, ForeignKey, JSON, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
+import hashlib
 import os
 
+from .compression import CompressedText, register_dictionary, set_dictionary_source
+
 # Use environment variable for database URL or default to data directory
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/resumatch.db")
 
@@ -34,9 +37,14 @@ class CVFile(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, nullable=False)
-    content = Column(Text, nullable=False)
+    content = Column(CompressedText, nullable=False)
     file_type = Column(String, nullable=False)
     file_size = Column(Integer, nullable=False)
+    content_hash = Column(String(64), index=True)  # SHA-256 of extracted text, used to detect duplicates
+    compacted_content = Column(CompressedText)  # Prompt-ready text cached by CVCompactor
+    token_count = Column(Integer)  # Estimated tokens before compaction
+    compacted_token_count = Column(Integer)  # Estimated tokens after compaction
+    is_test_artifact = Column(Boolean, default=False, nullable=False)  # Created by /api/test; pruned by retention
     uploaded_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationship to analysis results
@@ -44,6 +52,11 @@ class CVFile(Base):
 
 class AnalysisResult(Base):
     __tablename__ = "analysis_results"
+    __table_args__ = (
+        # Score-sorted rankings per job, and latest-first history per (job, CV) for retention
+        Index("ix_analysis_results_job_score", "job_id", "overall_score"),
+        Index("ix_analysis_results_job_cv_created", "job_id", "cv_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     cv_id = Column(Integer, ForeignKey("cv_files.id"), nullable=False)
@@ -51,14 +64,26 @@ class AnalysisResult(Base):
     overall_score = Column(Float, nullable=False)  # 0-100
     matching_skills = Column(JSON, nullable=False)  # Array of matching skills
     missing_skills = Column(JSON, nullable=False)   # Array of missing skills
-    summary = Column(Text, nullable=False)
-    detailed_analysis = Column(Text, nullable=False)
+    summary = Column(CompressedText, nullable=False)
+    detailed_analysis = Column(CompressedText, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     cv_file = relationship("CVFile", back_populates="analysis_results")
     job_description = relationship("JobDescription", back_populates="analysis_results")
 
+class CompressionDictionary(Base):
+    __tablename__ = "compression_dictionaries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    data = Column(LargeBinary, nullable=False)  # zlib preset dictionary
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+def hash_content(content: str) -> str:
+    """Fingerprint extracted CV text for duplicate detection"""
+    # PDF page breaks used to be newlines; hash them the same so older uploads still match
+    return hashlib.sha256(content.replace('\f', '\n').encode('utf-8')).hexdigest()
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
@@ -67,10 +92,123 @@ def get_db():
     finally:
         db.close()
 
+# Sample CV created by /api/test; retention deletes it after a grace period
+TEST_CV_FILENAME = "test_candidate.txt"
+TEST_CV_CONTENT = """
+John Doe
+Senior Software Engineer
+
+Experience:
+- 5 years developing web applications using React, Node.js, and Python
+- Experienced with PostgreSQL database design and optimization
+- Proficient in Git version control and Agile development
+- Strong problem-solving and communication skills
+
+Skills:
+React, JavaScript, Python, Node.js, PostgreSQL, Git, HTML, CSS
+""".strip()
+
+# Columns added after the initial schema: (table, column, DDL type, backfill SQL run once when added)
+ADDED_COLUMNS = [
+    ("cv_files", "content_hash", "VARCHAR(64)", None),
+    ("cv_files", "compacted_content", "TEXT", None),
+    ("cv_files", "token_count", "INTEGER", None),
+    ("cv_files", "compacted_token_count", "INTEGER", None),
+    ("cv_files", "is_test_artifact", "BOOLEAN NOT NULL DEFAULT FALSE",
+     "UPDATE cv_files SET is_test_artifact = TRUE WHERE filename = 'test_candidate.txt'"),
+]
+
+# Columns stored through CompressedText; PostgreSQL needs them as BYTEA
+COMPRESSED_COLUMNS = [
+    ("cv_files", "content"),
+    ("cv_files", "compacted_content"),
+    ("analysis_results", "summary"),
+    ("analysis_results", "detailed_analysis"),
+]
+
+def migrate_schema():
+    """Add columns and indexes missing from databases created by older versions"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, ddl_type, backfill in ADDED_COLUMNS:
+            existing = {col["name"] for col in inspector.get_columns(table)}
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+                if backfill:
+                    conn.execute(text(backfill))
+                print(f"Added column {table}.{column}")
+
+        # create_all only builds indexes together with new tables
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+        # SQLite stores BLOBs in TEXT columns as is; PostgreSQL must convert
+        if engine.dialect.name == "postgresql":
+            # Fresh inspector on this connection: the cached one misses the columns added above
+            inspector = inspect(conn)
+            for table, column in COMPRESSED_COLUMNS:
+                column_type = next(col["type"] for col in inspector.get_columns(table) if col["name"] == column)
+                if not isinstance(column_type, LargeBinary):
+                    conn.execute(text(
+                        f"ALTER TABLE {table} ALTER COLUMN {column} TYPE BYTEA USING convert_to({column}, 'UTF8')"
+                    ))
+                    print(f"Converted {table}.{column} to BYTEA")
+
+    # Fingerprint CVs uploaded before duplicate detection existed
+    db = SessionLocal()
+    try:
+        while True:
+            cvs = db.query(CVFile).filter(CVFile.content_hash.is_(None)).limit(500).all()
+            if not cvs:
+                break
+            for cv in cvs:
+                cv.content_hash = hash_content(cv.content)
+            db.commit()
+
+        # The is_test_artifact backfill matches by filename; user uploads that share it aren't test CVs
+        db.query(CVFile).filter(
+            CVFile.is_test_artifact == True,
+            CVFile.content_hash != hash_content(TEST_CV_CONTENT)
+        ).update({CVFile.is_test_artifact: False}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def vacuum_database():
+    """Return freed pages to the filesystem and refresh planner statistics"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE" if engine.dialect.name == "postgresql" else "VACUUM"))
+
+def load_compression_dictionaries():
+    """Register stored dictionaries so compressed columns can be read"""
+    db = SessionLocal()
+    try:
+        for dictionary in db.query(CompressionDictionary).all():
+            register_dictionary(dictionary.id, dictionary.data)
+    finally:
+        db.close()
+
+def _load_compression_dictionary(dictionary_id: int):
+    # Own connection: this runs while rows are being read or written through a session
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT data FROM compression_dictionaries WHERE id = :id"), {"id": dictionary_id}
+        ).scalar()
+
+def _latest_compression_dictionary_id():
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT MAX(id) FROM compression_dictionaries")).scalar()
+
+# Dictionaries trained by other processes after startup are loaded when first needed
+set_dictionary_source(_load_compression_dictionary, _latest_compression_dictionary_id)
+
 # Create tables
 def create_tables():
     try:
         Base.metadata.create_all(bind=engine)
+        load_compression_dictionaries()
+        migrate_schema()
         print("Database tables created successfully")
     except Exception as e:
         print(f"Error creating database tables: {e}")
@@ -0,0 +1,216 @@
+import argparse
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from typing import Iterator, List, Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .database import AnalysisResult, CVFile, JobDescription, SessionLocal, create_tables
+from .retention import result_parquet_schema
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+class _ChunkSink:
+    """Write-only file object that hands back what was written since the last drain"""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+class ResultExporter:
+    """
+    Streams analysis results joined with CV and job metadata as CSV, JSONL
+    or Parquet.
+
+    Only the selected columns are fetched, rows come from a server-side
+    cursor in chunks of EXPORT_CHUNK_SIZE, and each chunk is encoded and
+    yielded before the next is fetched, so memory use does not grow with
+    the size of the export. Rows are ordered as rankings: by job, then
+    score descending.
+    """
+
+    FORMATS = {
+        "csv": ("text/csv", "csv"),
+        "jsonl": ("application/x-ndjson", "jsonl"),
+        "parquet": ("application/vnd.apache.parquet", "parquet"),
+    }
+
+    DEFAULT_COLUMNS = [
+        "rank", "job_id", "job_title", "cv_id", "cv_filename", "overall_score",
+        "matching_skills", "missing_skills", "summary", "created_at",
+    ]
+
+    LIST_COLUMNS = ("matching_skills", "missing_skills")
+
+    def __init__(self, chunk_size: Optional[int] = None):
+        self.chunk_size = chunk_size or int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+        self.columns = {
+            "id": AnalysisResult.id,
+            "rank": func.row_number().over(
+                partition_by=AnalysisResult.job_id,
+                order_by=(AnalysisResult.overall_score.desc(), AnalysisResult.id)
+            ),
+            "job_id": AnalysisResult.job_id,
+            "job_title": JobDescription.title,
+            "cv_id": AnalysisResult.cv_id,
+            "cv_filename": CVFile.filename,
+            "overall_score": AnalysisResult.overall_score,
+            "matching_skills": AnalysisResult.matching_skills,
+            "missing_skills": AnalysisResult.missing_skills,
+            "summary": AnalysisResult.summary,
+            "detailed_analysis": AnalysisResult.detailed_analysis,
+            "created_at": AnalysisResult.created_at,
+        }
+
+    def validate(self, export_format: str, columns: Optional[Sequence[str]]) -> List[str]:
+        """Check the format and return the selected columns; raises ValueError"""
+        if export_format not in self.FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}. Use one of: {', '.join(self.FORMATS)}")
+        if export_format == "parquet" and pyarrow is None:
+            raise ValueError("Parquet export requires pyarrow. Install it or use csv/jsonl.")
+
+        selected = [column.strip() for column in columns or [] if column.strip()] or self.DEFAULT_COLUMNS
+        unknown = [column for column in selected if column not in self.columns]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}. Available: {', '.join(self.columns)}")
+        return list(dict.fromkeys(selected))
+
+    @staticmethod
+    def _as_datetime(value: date) -> datetime:
+        """Plain dates mean midnight, so date_to excludes that day"""
+        return value if isinstance(value, datetime) else datetime.combine(value, datetime.min.time())
+
+    def _query(self, columns: List[str], job_ids: Optional[Sequence[int]], date_from: Optional[date],
+               date_to: Optional[date], min_score: Optional[float]):
+        query = (
+            select(*[self.columns[column].label(column) for column in columns])
+            .select_from(AnalysisResult)
+        )
+        # Join only for the metadata that was asked for
+        if "job_title" in columns:
+            query = query.outerjoin(JobDescription, JobDescription.id == AnalysisResult.job_id)
+        if "cv_filename" in columns:
+            query = query.outerjoin(CVFile, CVFile.id == AnalysisResult.cv_id)
+
+        if job_ids:
+            query = query.where(AnalysisResult.job_id.in_(job_ids))
+        if date_from is not None:
+            query = query.where(AnalysisResult.created_at >= self._as_datetime(date_from))
+        if date_to is not None:
+            query = query.where(AnalysisResult.created_at < self._as_datetime(date_to))
+        if min_score is not None:
+            query = query.where(AnalysisResult.overall_score >= min_score)
+
+        # Rank numbers are computed after filtering, so they are ranks within the export
+        return query.order_by(AnalysisResult.job_id, AnalysisResult.overall_score.desc(), AnalysisResult.id)
+
+    def _encode_csv(self, rows, columns: List[str]) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                "; ".join(value) if column in self.LIST_COLUMNS and value is not None
+                else value.isoformat() if isinstance(value, datetime)
+                else value
+                for column, value in zip(columns, row)
+            ])
+        return buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def _encode_jsonl(rows, columns: List[str]) -> bytes:
+        return "".join(
+            json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows
+        ).encode("utf-8")
+
+    def stream(self, db: Session, export_format: str, columns: List[str], job_ids: Optional[Sequence[int]] = None,
+               date_from: Optional[date] = None, date_to: Optional[date] = None,
+               min_score: Optional[float] = None) -> Iterator[bytes]:
+        """Yield the encoded export chunk by chunk; columns come from validate()"""
+        query = self._query(columns, job_ids, date_from, date_to, min_score)
+        # yield_per streams from a server-side cursor where the driver supports one
+        result = db.execute(query.execution_options(yield_per=self.chunk_size))
+
+        if export_format == "csv":
+            header = io.StringIO()
+            csv.writer(header).writerow(columns)
+            yield header.getvalue().encode("utf-8")
+            for rows in result.partitions():
+                yield self._encode_csv(rows, columns)
+        elif export_format == "jsonl":
+            for rows in result.partitions():
+                yield self._encode_jsonl(rows, columns)
+        else:
+            sink = _ChunkSink()
+            schema = result_parquet_schema(columns)
+            writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="zstd")
+            try:
+                # One row group per chunk; each is flushed to the client as soon as it is written
+                for rows in result.partitions():
+                    writer.write_table(pyarrow.Table.from_pylist([dict(zip(columns, row)) for row in rows], schema))
+                    yield sink.drain()
+            finally:
+                writer.close()
+            yield sink.drain()
+
+    def filename(self, export_format: str) -> str:
+        timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        return f"analysis_results-{timestamp}.{self.FORMATS[export_format][1]}"
+
+    def media_type(self, export_format: str) -> str:
+        return self.FORMATS[export_format][0]
+
+def main():
+    parser = argparse.ArgumentParser(description="Export analysis rankings to CSV, JSONL or Parquet")
+    parser.add_argument("--format", default="csv", help="csv, jsonl or parquet (default: csv)")
+    # Not stdout: engine echo and create_tables() already print there
+    parser.add_argument("--output", "-o", required=True, help="Output file")
+    parser.add_argument("--columns", help=f"Comma-separated columns (default: {','.join(ResultExporter.DEFAULT_COLUMNS)})")
+    parser.add_argument("--job-id", type=int, action="append", dest="job_ids", help="Only this job; repeatable")
+    parser.add_argument("--date-from", type=datetime.fromisoformat, help="Only results created at or after (ISO date)")
+    parser.add_argument("--date-to", type=datetime.fromisoformat, help="Only results created before (ISO date)")
+    parser.add_argument("--min-score", type=float, help="Only results scoring at least this")
+    parser.add_argument("--chunk-size", type=int, help="Rows fetched and written per chunk")
+    args = parser.parse_args()
+
+    exporter = ResultExporter(chunk_size=args.chunk_size)
+    try:
+        columns = exporter.validate(args.format, args.columns.split(",") if args.columns else None)
+    except ValueError as e:
+        parser.error(str(e))
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        with open(args.output, "wb") as output:
+            for chunk in exporter.stream(db, args.format, columns, args.job_ids, args.date_from, args.date_to,
+                                         args.min_score):
+                output.write(chunk)
+    finally:
+        db.close()
+    print(f"Exported to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -15,8 +15,9 @@ class FileProcessor:
             pdf_reader = PyPDF2.PdfReader(pdf_file)
             text = ""
             
+            # Pages are separated by form feeds so page headers/footers can be recognised later
             for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
+                text += page.extract_text() + "\f"
             
             return text.strip()
         except Exception as e:
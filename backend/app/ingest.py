@@ -0,0 +1,286 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from sqlalchemy.orm import Session
+
+from .cv_compactor import CVCompactor
+from .database import CVFile, SessionLocal, create_tables, engine, hash_content
+from .file_processor import FileProcessor
+from .search import CVSearchIndex
+
+def _extract_file(filename: str, file_content: bytes) -> Tuple[str, str]:
+    """Worker entry point: runs in a separate process"""
+    return FileProcessor.process_file(filename, file_content)
+
+class BulkIngestor:
+    """
+    Fault-tolerant bulk CV ingestion from ZIP archives and directories.
+
+    Files are read lazily, text extraction runs in a process pool, and each
+    file is saved in its own savepoint so one bad file never affects the
+    others. After every committed batch the per-file statuses are appended
+    to a JSONL checkpoint, so an interrupted import resumes where it stopped.
+    """
+
+    STATUS_SAVED = "saved"
+    STATUS_DUPLICATE = "duplicate"
+    STATUS_FAILED = "failed"
+
+    def __init__(self, search_index: CVSearchIndex, workers: Optional[int] = None,
+                 batch_size: int = 32, checkpoint_dir: Optional[str] = None):
+        self.search_index = search_index
+        self.workers = workers or int(os.getenv("INGEST_WORKERS", "0")) or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.checkpoint_dir = checkpoint_dir or os.getenv("INGEST_CHECKPOINT_DIR", "./data/ingest_checkpoints")
+        self.max_file_size = int(os.getenv("INGEST_MAX_FILE_SIZE", str(10 * 1024 * 1024)))
+
+    # Sources
+
+    @staticmethod
+    def _skip_name(name: str) -> bool:
+        """Ignore directories, OS metadata and hidden files"""
+        parts = name.replace("\\", "/").split("/")
+        return name.endswith("/") or "__MACOSX" in parts or any(part.startswith(".") for part in parts if part)
+
+    def _iter_zip(self, archive: zipfile.ZipFile, done: Set[str]) -> Iterator[Tuple[str, Union[bytes, str]]]:
+        """Yield (name, bytes) per member, or (name, error) for members that can't be ingested"""
+        for info in archive.infolist():
+            if info.is_dir() or self._skip_name(info.filename) or info.filename in done:
+                continue
+            if not FileProcessor.validate_file_type(info.filename):
+                yield info.filename, f"Unsupported file type: {info.filename}"
+                continue
+            if info.file_size > self.max_file_size:
+                yield info.filename, f"File exceeds maximum size of {self.max_file_size} bytes"
+                continue
+            try:
+                with archive.open(info) as member:
+                    yield info.filename, member.read()
+            except Exception as e:
+                yield info.filename, f"Failed to read from archive: {str(e)}"
+
+    def _iter_directory(self, root: str, done: Set[str]) -> Iterator[Tuple[str, Union[bytes, str]]]:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, root).replace(os.sep, "/")
+                if self._skip_name(name) or name in done:
+                    continue
+                if not FileProcessor.validate_file_type(name):
+                    yield name, f"Unsupported file type: {name}"
+                    continue
+                try:
+                    if os.path.getsize(path) > self.max_file_size:
+                        yield name, f"File exceeds maximum size of {self.max_file_size} bytes"
+                        continue
+                    with open(path, "rb") as f:
+                        yield name, f.read()
+                except OSError as e:
+                    yield name, f"Failed to read file: {str(e)}"
+
+    # Checkpoints
+
+    def _checkpoint_path(self, source_id: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{source_id}.jsonl")
+
+    @staticmethod
+    def _load_checkpoint(path: str) -> Dict[str, Dict]:
+        statuses = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A partially written last line from an interrupted run
+                        continue
+                    statuses[entry["name"]] = entry
+        # Failures may be transient (read errors, database errors), so they are retried on resume
+        return {name: entry for name, entry in statuses.items() if entry["status"] != BulkIngestor.STATUS_FAILED}
+
+    @staticmethod
+    def _append_checkpoint(path: str, statuses: List[Dict]):
+        with open(path, "a", encoding="utf-8") as f:
+            for entry in statuses:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    # Ingestion
+
+    def _save(self, db: Session, name: str, text: str, file_type: str, file_size: int,
+              seen: Dict[str, int]) -> Dict:
+        if not text.strip():
+            return {"name": name, "status": self.STATUS_FAILED, "cv_id": None,
+                    "error": "No text could be extracted"}
+
+        content_hash = hash_content(text)
+        existing_id = seen.get(content_hash)
+        if existing_id is None:
+            existing = db.query(CVFile.id).filter(CVFile.content_hash == content_hash).first()
+            existing_id = existing.id if existing else None
+        if existing_id is not None:
+            seen[content_hash] = existing_id
+            return {"name": name, "status": self.STATUS_DUPLICATE, "cv_id": existing_id, "error": None}
+
+        try:
+            with db.begin_nested():
+                db_cv = CVFile(
+                    filename=os.path.basename(name),
+                    content=text,
+                    file_type=file_type,
+                    file_size=file_size,
+                    content_hash=content_hash
+                )
+                CVCompactor.cache_on(db_cv)
+                db.add(db_cv)
+                db.flush()
+                self.search_index.index_cv(db, db_cv)
+        except Exception as e:
+            return {"name": name, "status": self.STATUS_FAILED, "cv_id": None,
+                    "error": f"Failed to save: {str(e)}"}
+
+        seen[content_hash] = db_cv.id
+        return {"name": name, "status": self.STATUS_SAVED, "cv_id": db_cv.id, "error": None}
+
+    def _run(self, db: Session, source: str, source_id: str, files_factory, resume: bool) -> Dict:
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        checkpoint_path = self._checkpoint_path(source_id)
+        if not resume and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        done = self._load_checkpoint(checkpoint_path)
+        statuses = list(done.values())
+        seen: Dict[str, int] = {}
+
+        # spawn avoids forking a multi-threaded server process
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            files = files_factory(set(done))
+            while True:
+                batch = list(islice(files, self.batch_size))
+                if not batch:
+                    break
+
+                pending = []
+                for name, data in batch:
+                    if isinstance(data, str):
+                        pending.append((name, 0, None, data))
+                    else:
+                        pending.append((name, len(data), pool.submit(_extract_file, name, data), None))
+
+                batch_statuses = []
+                for name, size, future, error in pending:
+                    if future is not None:
+                        try:
+                            text, file_type = future.result()
+                        except Exception as e:
+                            error = f"Failed to process {name}: {str(e)}"
+                        else:
+                            batch_statuses.append(self._save(db, name, text, file_type, size, seen))
+                            continue
+                    batch_statuses.append({"name": name, "status": self.STATUS_FAILED,
+                                           "cv_id": None, "error": error})
+
+                db.commit()
+                self._append_checkpoint(checkpoint_path, batch_statuses)
+                statuses.extend(batch_statuses)
+
+        counts = {status: 0 for status in (self.STATUS_SAVED, self.STATUS_DUPLICATE, self.STATUS_FAILED)}
+        for entry in statuses:
+            counts[entry["status"]] += 1
+
+        return {
+            "source": source,
+            "total": len(statuses),
+            "saved": counts[self.STATUS_SAVED],
+            "duplicate": counts[self.STATUS_DUPLICATE],
+            "failed": counts[self.STATUS_FAILED],
+            "resumed": len(done),
+            "files": statuses
+        }
+
+    def ingest_zip(self, db: Session, archive: Union[str, BinaryIO], source: Optional[str] = None,
+                   resume: bool = True) -> Dict:
+        """Ingest every supported file in a ZIP archive (path or seekable file object)"""
+        if isinstance(archive, str):
+            source = source or archive
+            with open(archive, "rb") as f:
+                source_id = self._fingerprint(f)
+        else:
+            source = source or "upload.zip"
+            source_id = self._fingerprint(archive)
+
+        try:
+            zip_file = zipfile.ZipFile(archive)
+        except zipfile.BadZipFile:
+            raise ValueError("File is not a valid ZIP archive")
+
+        with zip_file:
+            return self._run(db, source, source_id, lambda done: self._iter_zip(zip_file, done), resume)
+
+    def ingest_directory(self, db: Session, path: str, resume: bool = True) -> Dict:
+        """Ingest every supported file under a directory, recursively"""
+        if not os.path.isdir(path):
+            raise ValueError(f"Not a directory: {path}")
+        root = os.path.abspath(path)
+        source_id = "dir-" + hashlib.sha256(root.encode("utf-8")).hexdigest()[:32]
+        return self._run(db, path, source_id, lambda done: self._iter_directory(root, done), resume)
+
+    @staticmethod
+    def _fingerprint(f: BinaryIO) -> str:
+        """Hash an archive so re-uploads of the same file share a checkpoint"""
+        digest = hashlib.sha256()
+        f.seek(0)
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+        f.seek(0)
+        return "zip-" + digest.hexdigest()[:32]
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import CVs from a ZIP archive or directory")
+    parser.add_argument("source", help="Path to a .zip archive or a directory of CV files")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel extraction processes")
+    parser.add_argument("--batch-size", type=int, default=32, help="Files per committed batch")
+    parser.add_argument("--checkpoint-dir", default=None, help="Where resume checkpoints are kept")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore any existing checkpoint")
+    parser.add_argument("--report", default=None, help="Write the full per-file report to this JSON file")
+    args = parser.parse_args()
+
+    create_tables()
+    search_index = CVSearchIndex(engine)
+    search_index.create()
+    ingestor = BulkIngestor(search_index, workers=args.workers, batch_size=args.batch_size,
+                            checkpoint_dir=args.checkpoint_dir)
+
+    db = SessionLocal()
+    try:
+        if os.path.isdir(args.source):
+            report = ingestor.ingest_directory(db, args.source, resume=not args.no_resume)
+        else:
+            report = ingestor.ingest_zip(db, args.source, resume=not args.no_resume)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        db.close()
+
+    for entry in report["files"]:
+        if entry["status"] == BulkIngestor.STATUS_FAILED:
+            print(f"FAILED  {entry['name']}: {entry['error']}")
+    print(f"{report['total']} files: {report['saved']} saved, {report['duplicate']} duplicate, "
+          f"{report['failed']} failed ({report['resumed']} from checkpoint)")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,57 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, status
+from fastapi import FastAPI, Depends, HTTPException, Request, UploadFile, File, Form, Query, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import List
+from pydantic import ValidationError
+from typing import List, Optional, Union
+from datetime import date, datetime
 import json
 import asyncio
 import os
 
-from .database import get_db, create_tables, JobDescription, CVFile, AnalysisResult
+from .database import (
+    engine, get_db, create_tables, hash_content, SessionLocal, JobDescription, CVFile, AnalysisResult,
+    TEST_CV_FILENAME, TEST_CV_CONTENT
+)
 from .schemas import (
-    JobDescriptionCreate, JobDescriptionResponse, CVFileResponse, 
-    AnalysisRequest, AnalysisResultResponse, TestResponse
+    JobDescriptionCreate, JobDescriptionResponse, BulkJobImportResponse, JobImportError,
+    CVFileResponse, CVSearchResponse, IngestReport, AnalysisRequest, AnalysisResultResponse,
+    StreamAnalysisRequest, PrescreenResult,
+    MatrixAnalysisRequest, MatrixAnalysisResponse, JobRanking, CVBestFit, RetentionReport, TestResponse
 )
 from .file_processor import FileProcessor
 from .ai_analyzer import AIAnalyzer
+from .cv_compactor import CVCompactor
+from .search import CVSearchIndex
+from .ingest import BulkIngestor
+from .retention import RetentionManager
+from .response_cache import ResponseCache
+from .export import ResultExporter
 
 # Create tables on startup
 create_tables()
 
+# Full-text search index over CV content
+search_index = CVSearchIndex(engine)
+search_index.create()
+
+# Bulk ingestion; server-side paths must live under INGEST_ROOT
+bulk_ingestor = BulkIngestor(search_index)
+ingest_root = os.getenv("INGEST_ROOT")
+
+# Retention policies for analysis history and test artifacts
+retention_manager = RetentionManager(search_index)
+retention_task = None
+
+# Cached read responses, invalidated by committed writes to the tables they read
+response_cache = ResponseCache()
+response_cache.track_session_writes(SessionLocal)
+
+# Streaming exports of analysis rankings
+result_exporter = ResultExporter()
+
 app = FastAPI(title="ResuMatch API", description="CV Analysis and Matching System", version="1.0.0")
 
 # Get allowed origins from environment variable
@@ -37,6 +69,29 @@ app.add_middleware(
 # Initialize AI analyzer
 ai_analyzer = AIAnalyzer()
 
+def run_retention(dry_run: bool = False):
+    db = SessionLocal()
+    try:
+        return retention_manager.run(db, dry_run=dry_run)
+    finally:
+        db.close()
+
+async def retention_loop():
+    """Apply retention policies periodically in the background"""
+    while True:
+        await asyncio.sleep(retention_manager.interval_minutes * 60)
+        try:
+            report = await asyncio.to_thread(run_retention)
+            print(f"Retention run completed: {report}")
+        except Exception as e:
+            print(f"Retention run failed: {e}")
+
+@app.on_event("startup")
+async def start_retention_task():
+    global retention_task
+    if retention_manager.interval_minutes > 0:
+        retention_task = asyncio.create_task(retention_loop())
+
 # Mount static files (React build)
 frontend_build_path = "/app/frontend/build"
 if os.path.exists(frontend_build_path):
@@ -55,10 +110,13 @@ async def serve_frontend():
 
 # Job Description Endpoints
 @app.get("/api/jobs", response_model=List[JobDescriptionResponse])
-async def get_all_jobs(db: Session = Depends(get_db)):
+async def get_all_jobs(request: Request, db: Session = Depends(get_db)):
     """Get all job descriptions"""
-    jobs = db.query(JobDescription).filter(JobDescription.active == True).all()
-    return jobs
+    def build():
+        jobs = db.query(JobDescription).filter(JobDescription.active == True).all()
+        return [JobDescriptionResponse.model_validate(job) for job in jobs]
+
+    return response_cache.respond(request, "jobs", [JobDescription.__tablename__], build)
 
 @app.post("/api/jobs", response_model=JobDescriptionResponse)
 async def create_job(job: JobDescriptionCreate, db: Session = Depends(get_db)):
@@ -116,53 +174,203 @@ async def upload_job_json(file: UploadFile = File(...), db: Session = Depends(ge
             detail="Job title must be unique"
         )
 
+@app.post("/api/jobs/upload-bulk", response_model=BulkJobImportResponse)
+async def upload_jobs_bulk(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """Import many job descriptions from a JSON array or NDJSON file.
+
+    Each job is validated and inserted independently; invalid entries and
+    duplicate titles are reported without rejecting the rest of the file.
+    """
+    try:
+        content = (await file.read()).decode('utf-8')
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be UTF-8 encoded"
+        )
+
+    try:
+        data = json.loads(content)
+        entries = data if isinstance(data, list) else [data]
+    except json.JSONDecodeError:
+        # Fall back to newline-delimited JSON
+        entries = []
+        for line_number, line in enumerate(content.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid JSON on line {line_number}"
+                )
+
+    created = []
+    errors = []
+    for index, entry in enumerate(entries):
+        title = entry.get('title') if isinstance(entry, dict) else None
+        # Only echo a usable title back; a malformed one is reported by validation below
+        title = title if isinstance(title, str) else None
+        try:
+            job = JobDescriptionCreate.model_validate(entry)
+        except ValidationError as e:
+            errors.append(JobImportError(index=index, title=title, error=str(e)))
+            continue
+
+        try:
+            # Savepoint per job so one duplicate doesn't roll back the others
+            with db.begin_nested():
+                db_job = JobDescription(
+                    title=job.title,
+                    description=job.description,
+                    requirements=job.requirements
+                )
+                db.add(db_job)
+            created.append(db_job)
+        except IntegrityError:
+            errors.append(JobImportError(index=index, title=title, error="Job title must be unique"))
+
+    db.commit()
+    for db_job in created:
+        db.refresh(db_job)
+
+    return BulkJobImportResponse(created=created, errors=errors)
+
 # CV File Endpoints
 @app.get("/api/cvs", response_model=List[CVFileResponse])
-async def get_all_cvs(db: Session = Depends(get_db)):
+async def get_all_cvs(request: Request, db: Session = Depends(get_db)):
     """Get all uploaded CV files"""
-    cvs = db.query(CVFile).all()
-    return cvs
+    def build():
+        cvs = db.query(CVFile).all()
+        return [CVFileResponse.model_validate(cv) for cv in cvs]
+
+    return response_cache.respond(request, "cvs", [CVFile.__tablename__], build)
 
 @app.post("/api/cvs/upload", response_model=List[CVFileResponse])
 async def upload_cvs(files: List[UploadFile] = File(...), db: Session = Depends(get_db)):
-    """Upload multiple CV files"""
-    uploaded_cvs = []
-    
+    """Upload multiple CV files.
+
+    Every file is validated and extracted before anything is saved, so the
+    upload either stores all files or none and reports every failing file.
+    """
+    processed = []
+    errors = []
     for file in files:
+        # Validate file type
+        if not FileProcessor.validate_file_type(file.filename):
+            errors.append(f"Unsupported file type: {file.filename}")
+            continue
+
         try:
-            # Validate file type
-            if not FileProcessor.validate_file_type(file.filename):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Unsupported file type: {file.filename}"
-                )
-            
-            # Read file content
+            # Read file content and extract text
             file_content = await file.read()
-            
-            # Process file and extract text
             extracted_text, file_type = FileProcessor.process_file(file.filename, file_content)
-            
-            # Save to database
+        except Exception as e:
+            errors.append(f"Failed to process {file.filename}: {str(e)}")
+            continue
+        processed.append((file.filename, extracted_text, file_type, len(file_content)))
+
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No files were saved. {'; '.join(errors)}"
+        )
+
+    uploaded_cvs = []
+    try:
+        for filename, extracted_text, file_type, file_size in processed:
             db_cv = CVFile(
-                filename=file.filename,
+                filename=filename,
                 content=extracted_text,
                 file_type=file_type,
-                file_size=len(file_content)
+                file_size=file_size,
+                content_hash=hash_content(extracted_text)
             )
+            CVCompactor.cache_on(db_cv)
             db.add(db_cv)
-            db.commit()
-            db.refresh(db_cv)
+            db.flush()
+            search_index.index_cv(db, db_cv)
             uploaded_cvs.append(db_cv)
-            
-        except Exception as e:
-            db.rollback()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No files were saved. Failed to store {filename}: {str(e)}"
+        )
+
+    for db_cv in uploaded_cvs:
+        db.refresh(db_cv)
+    return uploaded_cvs
+
+@app.post("/api/cvs/ingest", response_model=IngestReport)
+async def ingest_cvs(
+    file: Optional[UploadFile] = File(None),
+    path: Optional[str] = Form(None),
+    resume: bool = Form(True),
+    db: Session = Depends(get_db)
+):
+    """Bulk import CVs from an uploaded ZIP archive or a server-side directory/ZIP.
+
+    Every file gets its own status (saved, duplicate or failed), and an
+    interrupted import of the same source resumes from its checkpoint.
+    """
+    if (file is None) == (path is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide either a ZIP file upload or a server-side path"
+        )
+
+    try:
+        if file is not None:
+            return await asyncio.to_thread(
+                bulk_ingestor.ingest_zip, db, file.file, source=file.filename, resume=resume
+            )
+
+        if not ingest_root:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Failed to process {file.filename}: {str(e)}"
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Server-side ingestion is disabled (INGEST_ROOT is not set)"
             )
-    
-    return uploaded_cvs
+        root = os.path.realpath(ingest_root)
+        source_path = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, source_path]) != root or not os.path.exists(source_path):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Path not found under ingest root: {path}"
+            )
+
+        if os.path.isdir(source_path):
+            return await asyncio.to_thread(bulk_ingestor.ingest_directory, db, source_path, resume=resume)
+        return await asyncio.to_thread(bulk_ingestor.ingest_zip, db, source_path, resume=resume)
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@app.get("/api/cvs/search", response_model=CVSearchResponse)
+async def search_cvs(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over CV content and filenames.
+
+    Supports "quoted phrases", OR, -excluded terms and prefix* matches.
+    """
+    try:
+        total, hits = search_index.search(db, q, limit=limit, offset=offset)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    return CVSearchResponse(query=q, total=total, limit=limit, offset=offset, results=hits)
 
 # Analysis Endpoints
 @app.post("/api/analyze", response_model=List[AnalysisResultResponse])
@@ -185,8 +393,9 @@ async def analyze_cvs(request: AnalysisRequest, db: Session = Depends(get_db)):
             detail="No CV files found"
         )
     
-    # Prepare CV data for analysis
-    cv_data = [{"id": cv.id, "filename": cv.filename, "content": cv.content} for cv in cvs]
+    # Prepare CV data for analysis, compacting CVs uploaded before compaction existed
+    cv_data = [{"id": cv.id, "filename": cv.filename, "content": CVCompactor.cache_on(cv)} for cv in cvs]
+    db.commit()
     
     # Run AI analysis
     analysis_results = await ai_analyzer.analyze_multiple_cvs(
@@ -228,32 +437,293 @@ async def analyze_cvs(request: AnalysisRequest, db: Session = Depends(get_db)):
     
     return saved_results
 
+@app.post("/api/analyze/stream")
+async def analyze_cvs_stream(request: StreamAnalysisRequest, db: Session = Depends(get_db)):
+    """Analyze CVs against a job, streaming NDJSON events as results are parsed.
+
+    Each CV emits "update" events (score first, then summary, skills and
+    detailed analysis) followed by "result" once saved, "cutoff" when its
+    score is below min_score, or "error".
+    """
+    job = db.query(JobDescription).filter(JobDescription.id == request.job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job description not found"
+        )
+
+    cvs = db.query(CVFile).filter(CVFile.id.in_(request.cv_ids)).all()
+    if not cvs:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No CV files found"
+        )
+
+    cv_data = [{"id": cv.id, "filename": cv.filename, "content": CVCompactor.cache_on(cv)} for cv in cvs]
+    db.commit()
+    job_id, job_title = job.id, job.title
+    job_description, job_requirements = job.description, job.requirements
+
+    async def events():
+        queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(max(1, ai_analyzer.max_concurrency))
+
+        async def run(cv):
+            def on_update(fields):
+                queue.put_nowait({"cv_id": cv["id"], "event": "update", "fields": fields})
+                score = fields.get("overall_score")
+                return request.min_score is not None and score is not None and score < request.min_score
+
+            async with semaphore:
+                try:
+                    result = await ai_analyzer.analyze_cv_stream(
+                        job_description, job_requirements, cv["content"], on_update=on_update
+                    )
+                except Exception as e:
+                    queue.put_nowait({"cv_id": cv["id"], "event": "error", "error": str(e)})
+                    return
+
+            if not result["complete"]:
+                queue.put_nowait({"cv_id": cv["id"], "event": "cutoff", "overall_score": result.get("overall_score")})
+                return
+
+            try:
+                db_result = AnalysisResult(
+                    cv_id=cv["id"],
+                    job_id=job_id,
+                    overall_score=result['overall_score'],
+                    matching_skills=result['matching_skills'],
+                    missing_skills=result['missing_skills'],
+                    summary=result['summary'],
+                    detailed_analysis=result['detailed_analysis']
+                )
+                db.add(db_result)
+                db.commit()
+                db.refresh(db_result)
+            except Exception as e:
+                db.rollback()
+                queue.put_nowait({"cv_id": cv["id"], "event": "error", "error": f"Failed to save analysis: {str(e)}"})
+                return
+
+            response_data = AnalysisResultResponse(
+                id=db_result.id,
+                cv_id=db_result.cv_id,
+                job_id=db_result.job_id,
+                overall_score=db_result.overall_score,
+                matching_skills=db_result.matching_skills,
+                missing_skills=db_result.missing_skills,
+                summary=db_result.summary,
+                detailed_analysis=db_result.detailed_analysis,
+                created_at=db_result.created_at,
+                cv_filename=cv["filename"],
+                job_title=job_title
+            )
+            queue.put_nowait({"cv_id": cv["id"], "event": "result", "result": response_data.model_dump(mode="json")})
+
+        async def run_all():
+            try:
+                await asyncio.gather(*(run(cv) for cv in cv_data))
+            finally:
+                # Always end the stream, even if a CV failed unexpectedly
+                queue.put_nowait(None)
+
+        runner = asyncio.create_task(run_all())
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield json.dumps(event) + "\n"
+            await runner
+        finally:
+            # The client went away: stop calling Gemini and saving through the closed session
+            if not runner.done():
+                runner.cancel()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.post("/api/analyze/prescreen", response_model=List[PrescreenResult])
+async def prescreen_cvs(request: AnalysisRequest, db: Session = Depends(get_db)):
+    """Score-only pass: stops generation as soon as each CV's score is known.
+    Results are ranked but not saved."""
+    job = db.query(JobDescription).filter(JobDescription.id == request.job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job description not found"
+        )
+
+    cvs = db.query(CVFile).filter(CVFile.id.in_(request.cv_ids)).all()
+    if not cvs:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No CV files found"
+        )
+
+    cv_data = [{"id": cv.id, "filename": cv.filename, "content": CVCompactor.cache_on(cv)} for cv in cvs]
+    db.commit()
+    job_description, job_requirements = job.description, job.requirements
+    semaphore = asyncio.Semaphore(max(1, ai_analyzer.max_concurrency))
+
+    async def score(cv):
+        async with semaphore:
+            try:
+                result = await ai_analyzer.analyze_cv_stream(
+                    job_description, job_requirements, cv["content"], score_only=True
+                )
+                return PrescreenResult(cv_id=cv["id"], cv_filename=cv["filename"], overall_score=result["overall_score"])
+            except Exception as e:
+                return PrescreenResult(cv_id=cv["id"], cv_filename=cv["filename"], error=str(e))
+
+    results = await asyncio.gather(*(score(cv) for cv in cv_data))
+    return sorted(results, key=lambda r: r.overall_score if r.overall_score is not None else -1, reverse=True)
+
+@app.post("/api/analyze/matrix", response_model=MatrixAnalysisResponse)
+async def analyze_matrix(request: MatrixAnalysisRequest, db: Session = Depends(get_db)):
+    """Analyze a set of CVs against a set of jobs in one scheduled run"""
+
+    jobs = db.query(JobDescription).filter(JobDescription.id.in_(set(request.job_ids))).all()
+    if not jobs:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No job descriptions found"
+        )
+
+    cvs = db.query(CVFile).filter(CVFile.id.in_(set(request.cv_ids))).all()
+    if not cvs:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No CV files found"
+        )
+
+    job_data = [{"id": job.id, "description": job.description, "requirements": job.requirements} for job in jobs]
+    cv_data = [{"id": cv.id, "filename": cv.filename, "content": CVCompactor.cache_on(cv)} for cv in cvs]
+    db.commit()
+
+    rankings = await ai_analyzer.analyze_matrix(job_data, cv_data)
+
+    # Save all results in a single transaction
+    saved = []
+    for job in jobs:
+        for result in rankings[job.id]:
+            db_result = AnalysisResult(
+                cv_id=result['cv_id'],
+                job_id=job.id,
+                overall_score=result['overall_score'],
+                matching_skills=result['matching_skills'],
+                missing_skills=result['missing_skills'],
+                summary=result['summary'],
+                detailed_analysis=result['detailed_analysis']
+            )
+            db.add(db_result)
+            saved.append((job, result, db_result))
+    db.commit()
+
+    cv_filenames = {cv.id: cv.filename for cv in cvs}
+    job_rankings = {job.id: JobRanking(job_id=job.id, job_title=job.title, results=[]) for job in jobs}
+    best_fit = {cv.id: CVBestFit(cv_id=cv.id, cv_filename=cv.filename) for cv in cvs}
+
+    for job, result, db_result in saved:
+        db.refresh(db_result)
+        job_rankings[job.id].results.append(AnalysisResultResponse(
+            id=db_result.id,
+            cv_id=db_result.cv_id,
+            job_id=db_result.job_id,
+            overall_score=db_result.overall_score,
+            matching_skills=db_result.matching_skills,
+            missing_skills=db_result.missing_skills,
+            summary=db_result.summary,
+            detailed_analysis=db_result.detailed_analysis,
+            created_at=db_result.created_at,
+            cv_filename=cv_filenames.get(db_result.cv_id, "Unknown"),
+            job_title=job.title
+        ))
+
+        # Failed analyses never count as a fit
+        fit = best_fit[db_result.cv_id]
+        if not result['error'] and (fit.overall_score is None or db_result.overall_score > fit.overall_score):
+            fit.job_id = job.id
+            fit.job_title = job.title
+            fit.overall_score = db_result.overall_score
+
+    return MatrixAnalysisResponse(
+        rankings=list(job_rankings.values()),
+        best_fit=sorted(best_fit.values(), key=lambda fit: fit.cv_id)
+    )
+
+@app.get("/api/analyses/export")
+async def export_analyses(
+    format: str = Query("csv", description="csv, jsonl or parquet"),
+    columns: Optional[str] = Query(None, description="Comma-separated columns to include"),
+    job_id: Optional[List[int]] = Query(None),
+    date_from: Optional[Union[datetime, date]] = None,
+    date_to: Optional[Union[datetime, date]] = None,
+    min_score: Optional[float] = Query(None, ge=0, le=100)
+):
+    """Stream analysis results with CV and job metadata as a CSV, JSONL or Parquet download"""
+    try:
+        selected = result_exporter.validate(format, columns.split(",") if columns else None)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    def chunks():
+        # Own session: the generator runs after the request handler has returned
+        db = SessionLocal()
+        try:
+            yield from result_exporter.stream(db, format, selected, job_id, date_from, date_to, min_score)
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        chunks(),
+        media_type=result_exporter.media_type(format),
+        headers={"Content-Disposition": f'attachment; filename="{result_exporter.filename(format)}"'}
+    )
+
 @app.get("/api/analyses/{job_id}", response_model=List[AnalysisResultResponse])
-async def get_job_analyses(job_id: int, db: Session = Depends(get_db)):
+async def get_job_analyses(job_id: int, request: Request, db: Session = Depends(get_db)):
     """Get all analysis results for a specific job"""
-    analyses = db.query(AnalysisResult).filter(AnalysisResult.job_id == job_id).all()
-    
-    result = []
-    for analysis in analyses:
-        cv = db.query(CVFile).filter(CVFile.id == analysis.cv_id).first()
-        job = db.query(JobDescription).filter(JobDescription.id == analysis.job_id).first()
-        
-        response_data = AnalysisResultResponse(
-            id=analysis.id,
-            cv_id=analysis.cv_id,
-            job_id=analysis.job_id,
-            overall_score=analysis.overall_score,
-            matching_skills=analysis.matching_skills,
-            missing_skills=analysis.missing_skills,
-            summary=analysis.summary,
-            detailed_analysis=analysis.detailed_analysis,
-            created_at=analysis.created_at,
-            cv_filename=cv.filename if cv else "Unknown",
-            job_title=job.title if job else "Unknown"
+    def build():
+        rows = (
+            db.query(AnalysisResult, CVFile.filename, JobDescription.title)
+            .outerjoin(CVFile, CVFile.id == AnalysisResult.cv_id)
+            .outerjoin(JobDescription, JobDescription.id == AnalysisResult.job_id)
+            .filter(AnalysisResult.job_id == job_id)
+            .order_by(AnalysisResult.id)
+            .all()
         )
-        result.append(response_data)
-    
-    return result
+        return [
+            AnalysisResultResponse(
+                id=analysis.id,
+                cv_id=analysis.cv_id,
+                job_id=analysis.job_id,
+                overall_score=analysis.overall_score,
+                matching_skills=analysis.matching_skills,
+                missing_skills=analysis.missing_skills,
+                summary=analysis.summary,
+                detailed_analysis=analysis.detailed_analysis,
+                created_at=analysis.created_at,
+                cv_filename=filename or "Unknown",
+                job_title=title or "Unknown"
+            )
+            for analysis, filename, title in rows
+        ]
+
+    def job_exists(results):
+        # Don't let requests for arbitrary job ids fill the cache with empty lists
+        return bool(results) or db.query(JobDescription.id).filter(JobDescription.id == job_id).first() is not None
+
+    tables = [AnalysisResult.__tablename__, CVFile.__tablename__, JobDescription.__tablename__]
+    return response_cache.respond(request, f"analyses:{job_id}", tables, build, cacheable=job_exists)
+
+# Maintenance Endpoints
+@app.post("/api/maintenance/retention", response_model=RetentionReport)
+async def apply_retention(dry_run: bool = False):
+    """Apply retention policies now instead of waiting for the background task"""
+    return await asyncio.to_thread(run_retention, dry_run)
 
 # Test Endpoint
 @app.get("/api/test", response_model=TestResponse)
@@ -321,27 +791,18 @@ async def test_system(db: Session = Depends(get_db)):
         
         # Test 3: Create sample CV
         try:
-            sample_cv_content = """
-John Doe
-Senior Software Engineer
-
-Experience:
-- 5 years developing web applications using React, Node.js, and Python
-- Experienced with PostgreSQL database design and optimization
-- Proficient in Git version control and Agile development
-- Strong problem-solving and communication skills
-
-Skills:
-React, JavaScript, Python, Node.js, PostgreSQL, Git, HTML, CSS
-            """.strip()
-            
+            sample_cv_content = TEST_CV_CONTENT
             sample_cv = CVFile(
-                filename="test_candidate.txt",
+                filename=TEST_CV_FILENAME,
                 content=sample_cv_content,
                 file_type="txt",
-                file_size=len(sample_cv_content.encode('utf-8'))
+                file_size=len(sample_cv_content.encode('utf-8')),
+                content_hash=hash_content(sample_cv_content),
+                is_test_artifact=True
             )
+            CVCompactor.cache_on(sample_cv)
             
+            # Not added to the search index: the healthcheck creates one of these every 30s
             db.add(sample_cv)
             db.commit()
             db.refresh(sample_cv)
@@ -372,7 +833,7 @@ React, JavaScript, Python, Node.js, PostgreSQL, Git, HTML, CSS
                     "missing_skills": []
                 }
             else:
-                cv_data = [{"id": sample_cv.id, "filename": sample_cv.filename, "content": sample_cv.content}]
+                cv_data = [{"id": sample_cv.id, "filename": sample_cv.filename, "content": sample_cv.compacted_content}]
                 analysis_result = await ai_analyzer.analyze_multiple_cvs(
                     sample_job.description, sample_job.requirements, cv_data
                 )
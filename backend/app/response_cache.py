@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+
+class ResponseCache:
+    """
+    In-process cache of serialized read responses with ETag revalidation.
+
+    Every table has a version counter. Committed ORM writes bump the counters
+    of the tables they touched (see track_session_writes), which invalidates
+    cached payloads built from those tables. While an entry is valid, a
+    matching If-None-Match gets a 304 without querying the database.
+
+    Entries also expire after a TTL, so writes made by other processes
+    (the CLIs, other workers) are picked up within that time. The ETag is a
+    hash of the payload, so clients still get 304 after a rebuild when
+    nothing actually changed.
+    """
+
+    # Approximate bookkeeping per entry (OrderedDict node, tuples, version snapshot)
+    ENTRY_OVERHEAD = 512
+
+    def __init__(self, max_bytes: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_bytes = max_bytes or int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+        self.versions: Dict[str, int] = {}
+        # key -> (table versions when built, expiry time, etag, body, accounted size)
+        self.entries: "OrderedDict[str, Tuple[Tuple[int, ...], float, str, bytes, int]]" = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def bump(self, *tables: str):
+        with self.lock:
+            for table in tables:
+                self.versions[table] = self.versions.get(table, 0) + 1
+
+    def _snapshot(self, tables: Sequence[str]) -> Tuple[int, ...]:
+        return tuple(self.versions.get(table, 0) for table in tables)
+
+    def _get(self, key: str, tables: Sequence[str]) -> Optional[Tuple[str, bytes]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            versions, expires_at, etag, body, _ = entry
+            if versions != self._snapshot(tables) or expires_at < time.monotonic():
+                self._evict(key)
+                return None
+            self.entries.move_to_end(key)
+            return etag, body
+
+    def _put(self, key: str, versions: Tuple[int, ...], etag: str, body: bytes):
+        # Counting keys and bookkeeping too keeps many tiny entries (e.g. empty lists) within the cap
+        cost = len(body) + len(key) + len(etag) + self.ENTRY_OVERHEAD
+        if cost > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._evict(key)
+            self.entries[key] = (versions, time.monotonic() + self.ttl_seconds, etag, body, cost)
+            self.size += cost
+            while self.size > self.max_bytes:
+                self._evict(next(iter(self.entries)))
+
+    def _evict(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[4]
+
+    @staticmethod
+    def _etag_matches(request: Request, etag: str) -> bool:
+        header = request.headers.get("if-none-match")
+        if not header:
+            return False
+        candidates = [candidate.strip() for candidate in header.split(",")]
+        # Weak comparison, as RFC 9110 requires for If-None-Match
+        return "*" in candidates or etag in [candidate.removeprefix("W/") for candidate in candidates]
+
+    def respond(self, request: Request, key: str, tables: Sequence[str], build: Callable[[], Any],
+                cacheable: Optional[Callable[[Any], bool]] = None) -> Response:
+        """
+        Serve a cached JSON payload, a 304, or build, cache and serve a fresh one.
+        cacheable can veto caching a built payload (it is still served with an ETag).
+        """
+        cached = self._get(key, tables)
+        if cached is None:
+            # Snapshot first: a write racing with build() leaves this entry already stale
+            with self.lock:
+                versions = self._snapshot(tables)
+            payload = build()
+            body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode("utf-8")
+            etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+            if cacheable is None or cacheable(payload):
+                self._put(key, versions, etag, body)
+        else:
+            etag, body = cached
+
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if self._etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def track_session_writes(self, session_factory: sessionmaker):
+        """Bump table versions whenever a session from this factory commits writes"""
+
+        @event.listens_for(session_factory, "after_flush")
+        def collect_flushed_tables(session: Session, flush_context):
+            tables = session.info.setdefault("written_tables", set())
+            for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+                table = getattr(obj, "__tablename__", None)
+                if table:
+                    tables.add(table)
+
+        @event.listens_for(session_factory, "do_orm_execute")
+        def collect_bulk_tables(orm_execute_state):
+            if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+                mapper = orm_execute_state.bind_mapper
+                if mapper is not None:
+                    orm_execute_state.session.info.setdefault("written_tables", set()).add(mapper.local_table.name)
+
+        @event.listens_for(session_factory, "after_commit")
+        def bump_written_tables(session: Session):
+            tables = session.info.pop("written_tables", None)
+            if tables:
+                self.bump(*tables)
+
+        @event.listens_for(session_factory, "after_soft_rollback")
+        def discard_written_tables(session: Session, previous_transaction):
+            if not session.in_transaction():
+                session.info.pop("written_tables", None)
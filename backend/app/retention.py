@@ -0,0 +1,234 @@
+import argparse
+import gzip
+import json
+import os
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.orm import Session
+
+from .database import AnalysisResult, CVFile, JobDescription, SessionLocal, create_tables, engine, vacuum_database
+from .search import CVSearchIndex
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+def result_parquet_schema(columns: List[str]):
+    """Arrow schema for analysis result columns, shared by retention archives and exports"""
+    # Explicit, so a batch where every skill list is empty can't make the columns list<null>
+    types = {
+        "id": pyarrow.int64(), "rank": pyarrow.int64(), "job_id": pyarrow.int64(), "cv_id": pyarrow.int64(),
+        "job_title": pyarrow.string(), "cv_filename": pyarrow.string(), "overall_score": pyarrow.float64(),
+        "matching_skills": pyarrow.list_(pyarrow.string()), "missing_skills": pyarrow.list_(pyarrow.string()),
+        "summary": pyarrow.string(), "detailed_analysis": pyarrow.string(), "created_at": pyarrow.timestamp("us"),
+    }
+    return pyarrow.schema([(column, types[column]) for column in columns])
+
+class _ArchiveWriter:
+    """Appends archived rows to one gzip JSONL or Parquet file per retention run"""
+
+    COLUMNS = [
+        "id", "cv_id", "job_id", "cv_filename", "job_title", "overall_score",
+        "matching_skills", "missing_skills", "summary", "detailed_analysis", "created_at",
+    ]
+
+    def __init__(self, directory: str, archive_format: str):
+        self.format = archive_format
+        extension = "parquet" if archive_format == "parquet" else "jsonl.gz"
+        timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        self.path = os.path.join(directory, f"analysis_results-{timestamp}.{extension}")
+        self.directory = directory
+        self._writer = None
+
+    def write(self, records: List[Dict]):
+        if not records:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+
+        if self.format == "parquet":
+            if self._writer is None:
+                self._writer = pyarrow.parquet.ParquetWriter(
+                    self.path, result_parquet_schema(self.COLUMNS), compression="zstd"
+                )
+            self._writer.write_table(pyarrow.Table.from_pylist(records, self._writer.schema))
+        else:
+            # Each batch is its own gzip member; readers see a single stream
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, default=str) + "\n")
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+class RetentionManager:
+    """
+    Keeps the working set of analysis_results and cv_files bounded.
+
+    Policies: keep only the newest N results per (job, CV); optionally
+    archive results older than a maximum age (the newest result for each
+    pair is always kept); delete /api/test CVs after a grace period.
+    Archived results are written to compressed JSONL or Parquet files before
+    they are deleted, and the database is re-analyzed/vacuumed afterwards.
+    """
+
+    BATCH_SIZE = 500
+
+    def __init__(self, search_index: CVSearchIndex):
+        self.search_index = search_index
+        self.keep_per_pair = int(os.getenv("RETENTION_KEEP_PER_PAIR", "3"))
+        self.max_age_days = int(os.getenv("RETENTION_MAX_AGE_DAYS", "0"))
+        self.test_artifact_hours = int(os.getenv("RETENTION_TEST_ARTIFACT_HOURS", "24"))
+        self.archive_dir = os.getenv("RETENTION_ARCHIVE_DIR", "./data/archive")
+        self.archive_format = os.getenv("RETENTION_ARCHIVE_FORMAT", "jsonl").lower()
+        self.interval_minutes = int(os.getenv("RETENTION_INTERVAL_MINUTES", "60"))
+        self.vacuum_free_ratio = float(os.getenv("RETENTION_VACUUM_FREE_RATIO", "0.2"))
+
+        if self.archive_format not in ("jsonl", "parquet"):
+            raise ValueError(f"Unsupported archive format: {self.archive_format}")
+        if self.archive_format == "parquet" and pyarrow is None:
+            raise RuntimeError("Parquet archives require pyarrow. Install it or use RETENTION_ARCHIVE_FORMAT=jsonl.")
+
+    def _expired_result_ids(self, db: Session) -> array:
+        """All expired ids in one pass; the window covers the whole table, so it isn't re-run per batch"""
+        rank = func.row_number().over(
+            partition_by=(AnalysisResult.job_id, AnalysisResult.cv_id),
+            order_by=(AnalysisResult.created_at.desc(), AnalysisResult.id.desc())
+        ).label("rank")
+        ranked = select(AnalysisResult.id, AnalysisResult.created_at, rank).subquery()
+
+        conditions = [ranked.c.rank > max(1, self.keep_per_pair)]
+        if self.max_age_days > 0:
+            cutoff = datetime.utcnow() - timedelta(days=self.max_age_days)
+            conditions.append((ranked.c.created_at < cutoff) & (ranked.c.rank > 1))
+
+        query = select(ranked.c.id).where(or_(*conditions)).order_by(ranked.c.id)
+        # Packed 64-bit ints: millions of ids stay a few MB
+        return array("q", db.execute(query).scalars())
+
+    def _archive_results(self, db: Session, dry_run: bool) -> Dict:
+        expired = self._expired_result_ids(db)
+        if dry_run:
+            return {"results_archived": len(expired), "archive_path": None}
+
+        archived = 0
+        writer = None
+        try:
+            for offset in range(0, len(expired), self.BATCH_SIZE):
+                ids = expired[offset:offset + self.BATCH_SIZE].tolist()
+                rows = (
+                    db.query(AnalysisResult, CVFile.filename, JobDescription.title)
+                    .outerjoin(CVFile, CVFile.id == AnalysisResult.cv_id)
+                    .outerjoin(JobDescription, JobDescription.id == AnalysisResult.job_id)
+                    .filter(AnalysisResult.id.in_(ids))
+                    .order_by(AnalysisResult.id)
+                    .all()
+                )
+                records = [{
+                    "id": result.id,
+                    "cv_id": result.cv_id,
+                    "job_id": result.job_id,
+                    "cv_filename": filename,
+                    "job_title": title,
+                    "overall_score": result.overall_score,
+                    "matching_skills": result.matching_skills,
+                    "missing_skills": result.missing_skills,
+                    "summary": result.summary,
+                    "detailed_analysis": result.detailed_analysis,
+                    "created_at": result.created_at,
+                } for result, filename, title in rows]
+                if not records:
+                    # Already removed, e.g. by a concurrent run
+                    continue
+
+                # Written before the delete commits, so a crash can only duplicate archived rows
+                writer = writer or _ArchiveWriter(self.archive_dir, self.archive_format)
+                writer.write(records)
+                db.query(AnalysisResult).filter(AnalysisResult.id.in_(ids)).delete(synchronize_session=False)
+                db.commit()
+                archived += len(records)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        return {"results_archived": archived, "archive_path": writer.path if writer else None}
+
+    def _prune_test_artifacts(self, db: Session, dry_run: bool) -> Dict:
+        cutoff = datetime.utcnow() - timedelta(hours=self.test_artifact_hours)
+        expired = db.query(CVFile.id).filter(CVFile.is_test_artifact == True, CVFile.uploaded_at < cutoff)
+
+        if dry_run:
+            cv_ids = [row.id for row in expired.all()]
+            results = db.query(AnalysisResult).filter(AnalysisResult.cv_id.in_(cv_ids)).count() if cv_ids else 0
+            return {"test_cvs_deleted": len(cv_ids), "test_results_deleted": results}
+
+        cvs_deleted = 0
+        results_deleted = 0
+        while True:
+            cv_ids = [row.id for row in expired.limit(self.BATCH_SIZE).all()]
+            if not cv_ids:
+                break
+            results_deleted += (
+                db.query(AnalysisResult).filter(AnalysisResult.cv_id.in_(cv_ids)).delete(synchronize_session=False)
+            )
+            for cv_id in cv_ids:
+                self.search_index.remove_cv(db, cv_id)
+            cvs_deleted += db.query(CVFile).filter(CVFile.id.in_(cv_ids)).delete(synchronize_session=False)
+            db.commit()
+
+        return {"test_cvs_deleted": cvs_deleted, "test_results_deleted": results_deleted}
+
+    def _maintain(self) -> bool:
+        """Refresh statistics and merge FTS segments; VACUUM when enough pages are free"""
+        if engine.dialect.name == "postgresql":
+            vacuum_database()
+            return True
+
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+            table = self.search_index.TABLE_NAME
+            conn.execute(text(f"INSERT INTO {table}({table}) VALUES ('optimize')"))
+            page_count = conn.execute(text("PRAGMA page_count")).scalar() or 0
+            freelist_count = conn.execute(text("PRAGMA freelist_count")).scalar() or 0
+
+        if page_count and freelist_count / page_count >= self.vacuum_free_ratio:
+            vacuum_database()
+            return True
+        return False
+
+    def run(self, db: Session, dry_run: bool = False) -> Dict:
+        """Apply every retention policy once; returns what was (or would be) removed"""
+        report = {"dry_run": dry_run}
+        report.update(self._prune_test_artifacts(db, dry_run))
+        report.update(self._archive_results(db, dry_run))
+
+        removed = report["test_cvs_deleted"] + report["test_results_deleted"] + report["results_archived"]
+        report["vacuumed"] = False if dry_run or not removed else self._maintain()
+        return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply retention policies to analysis history")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be removed without changing anything")
+    args = parser.parse_args()
+
+    create_tables()
+    search_index = CVSearchIndex(engine)
+    search_index.create()
+    manager = RetentionManager(search_index)
+
+    db = SessionLocal()
+    try:
+        report = manager.run(db, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -19,17 +19,59 @@ class JobDescriptionResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class JobImportError(BaseModel):
+    index: int
+    title: Optional[str] = None
+    error: str
+
+class BulkJobImportResponse(BaseModel):
+    created: List[JobDescriptionResponse]
+    errors: List[JobImportError]
+
 # CV File Schemas
 class CVFileResponse(BaseModel):
     id: int
     filename: str
     file_type: str
     file_size: int
+    token_count: Optional[int] = None
+    compacted_token_count: Optional[int] = None
     uploaded_at: datetime
 
     class Config:
         from_attributes = True
 
+class IngestFileStatus(BaseModel):
+    name: str
+    status: str  # saved, duplicate or failed
+    cv_id: Optional[int] = None
+    error: Optional[str] = None
+
+class IngestReport(BaseModel):
+    source: str
+    total: int
+    saved: int
+    duplicate: int
+    failed: int
+    resumed: int
+    files: List[IngestFileStatus]
+
+class CVSearchHit(BaseModel):
+    id: int
+    filename: str
+    file_type: str
+    file_size: int
+    uploaded_at: datetime
+    rank: float
+    snippet: str
+
+class CVSearchResponse(BaseModel):
+    query: str
+    total: int
+    limit: int
+    offset: int
+    results: List[CVSearchHit]
+
 # Analysis Result Schemas
 class AnalysisRequest(BaseModel):
     job_id: int
@@ -51,6 +93,45 @@ class AnalysisResultResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class StreamAnalysisRequest(AnalysisRequest):
+    # Stop generating for CVs whose score comes in below this
+    min_score: Optional[float] = Field(None, ge=0, le=100)
+
+class PrescreenResult(BaseModel):
+    cv_id: int
+    cv_filename: str
+    overall_score: Optional[float] = None
+    error: Optional[str] = None
+
+class MatrixAnalysisRequest(BaseModel):
+    job_ids: List[int] = Field(..., min_items=1)
+    cv_ids: List[int] = Field(..., min_items=1)
+
+class JobRanking(BaseModel):
+    job_id: int
+    job_title: str
+    results: List[AnalysisResultResponse]
+
+class CVBestFit(BaseModel):
+    cv_id: int
+    cv_filename: str
+    job_id: Optional[int] = None
+    job_title: Optional[str] = None
+    overall_score: Optional[float] = None
+
+class MatrixAnalysisResponse(BaseModel):
+    rankings: List[JobRanking]
+    best_fit: List[CVBestFit]
+
+# Maintenance Schemas
+class RetentionReport(BaseModel):
+    dry_run: bool
+    test_cvs_deleted: int
+    test_results_deleted: int
+    results_archived: int
+    archive_path: Optional[str] = None
+    vacuumed: bool
+
 # Test Endpoint Response
 class TestResponse(BaseModel):
     status: str
@@ -0,0 +1,222 @@
+import html
+import re
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .database import CVFile
+
+class CVSearchIndex:
+    """Full-text index over CV filenames and extracted content.
+
+    Uses an FTS5 virtual table on SQLite and a GIN-indexed tsvector table on
+    PostgreSQL. Rows are written through the caller's session so the index
+    commits or rolls back together with the CV itself.
+    """
+
+    TABLE_NAME = "cv_search"
+    SNIPPET_START = "<mark>"
+    SNIPPET_END = "</mark>"
+    # Placeholders the database wraps matches in; CV text is HTML-escaped before they become <mark> tags
+    _MATCH_START = "\x02"
+    _MATCH_END = "\x03"
+    BACKFILL_BATCH_SIZE = 500
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.dialect = engine.dialect.name
+
+    @property
+    def is_postgres(self) -> bool:
+        return self.dialect == "postgresql"
+
+    def create(self):
+        """Create the index structures and index any CVs not yet covered"""
+        with self.engine.begin() as conn:
+            if self.is_postgres:
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {self.TABLE_NAME} ("
+                    "cv_id INTEGER PRIMARY KEY REFERENCES cv_files(id) ON DELETE CASCADE, "
+                    "document TSVECTOR NOT NULL)"
+                ))
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{self.TABLE_NAME}_document "
+                    f"ON {self.TABLE_NAME} USING GIN (document)"
+                ))
+            else:
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.TABLE_NAME} "
+                    "USING fts5(filename, content, tokenize='porter unicode61')"
+                ))
+
+        with Session(self.engine) as db:
+            indexed = 0
+            while True:
+                missing = self._unindexed_cvs(db)
+                if not missing:
+                    break
+                for cv in missing:
+                    self.index_cv(db, cv)
+                db.commit()
+                indexed += len(missing)
+            if indexed:
+                print(f"Indexed {indexed} CV files for full-text search")
+
+    def _unindexed_cvs(self, db: Session) -> List[CVFile]:
+        key = "cv_id" if self.is_postgres else "rowid"
+        return (
+            db.query(CVFile)
+            .filter(text(f"cv_files.id NOT IN (SELECT {key} FROM {self.TABLE_NAME})"))
+            .filter(CVFile.is_test_artifact == False)
+            .order_by(CVFile.id)
+            .limit(self.BACKFILL_BATCH_SIZE)
+            .all()
+        )
+
+    def index_cv(self, db: Session, cv: CVFile):
+        """Add or refresh a CV in the index (caller commits); /api/test CVs are never indexed"""
+        if cv.is_test_artifact:
+            return
+        if cv.id is None:
+            db.flush()
+
+        if self.is_postgres:
+            db.execute(text(
+                f"INSERT INTO {self.TABLE_NAME} (cv_id, document) VALUES (:id, "
+                "setweight(to_tsvector('english', :filename), 'A') || "
+                "setweight(to_tsvector('english', :content), 'B')) "
+                "ON CONFLICT (cv_id) DO UPDATE SET document = EXCLUDED.document"
+            ), {"id": cv.id, "filename": cv.filename, "content": cv.content})
+        else:
+            # FTS5 has no upsert, so replace any existing row for this CV
+            db.execute(text(f"DELETE FROM {self.TABLE_NAME} WHERE rowid = :id"), {"id": cv.id})
+            db.execute(text(
+                f"INSERT INTO {self.TABLE_NAME} (rowid, filename, content) VALUES (:id, :filename, :content)"
+            ), {"id": cv.id, "filename": cv.filename, "content": cv.content})
+
+    def remove_cv(self, db: Session, cv_id: int):
+        """Remove a CV from the index (caller commits)"""
+        key = "cv_id" if self.is_postgres else "rowid"
+        db.execute(text(f"DELETE FROM {self.TABLE_NAME} WHERE {key} = :id"), {"id": cv_id})
+
+    @staticmethod
+    def build_fts5_query(query: str) -> str:
+        """
+        Translate a web-search style query into an FTS5 MATCH expression.
+
+        Supports implicit AND between terms, "quoted phrases", OR, trailing *
+        for prefix matches, and -term / NOT term for exclusion. Every term is
+        quoted so user input can never produce an FTS5 syntax error.
+        """
+        groups: List[List[str]] = [[]]
+        excluded: List[str] = []
+        negate_next = False
+        pending_or = False
+
+        for token in re.findall(r'-?"[^"]*"?|\S+', query):
+            upper = token.upper()
+            if upper == "OR":
+                pending_or = bool(groups[-1])
+                continue
+            if upper == "AND":
+                continue
+            if upper == "NOT":
+                negate_next = True
+                continue
+
+            negated = negate_next or (token.startswith("-") and len(token) > 1)
+            negate_next = False
+            if token.startswith("-"):
+                token = token[1:]
+
+            prefix = token.endswith("*") and not token.startswith('"')
+            term = token.strip('"').rstrip("*").replace('"', "").strip()
+            if not term:
+                continue
+            term = f'"{term}"' + ("*" if prefix else "")
+
+            if negated:
+                excluded.append(term)
+            elif pending_or:
+                groups[-1].append(term)
+                pending_or = False
+            else:
+                if groups[-1]:
+                    groups.append([])
+                groups[-1].append(term)
+
+        clauses = []
+        for group in groups:
+            if len(group) == 1:
+                clauses.append(group[0])
+            elif group:
+                clauses.append("(" + " OR ".join(group) + ")")
+
+        if not clauses:
+            raise ValueError("Search query must contain at least one term to match")
+
+        expression = " AND ".join(clauses)
+        if excluded:
+            expression = f"({expression})" + "".join(f" NOT {term}" for term in excluded)
+        return expression
+
+    def search(self, db: Session, query: str, limit: int = 20, offset: int = 0) -> Tuple[int, List[Dict]]:
+        """
+        Search CVs by content and filename
+        Returns: (total_matches, page_of_hits) with the best matches first
+        """
+        if self.is_postgres:
+            params = {"q": query, "limit": limit, "offset": offset}
+            match_sql = (
+                f"FROM {self.TABLE_NAME} s JOIN cv_files ON cv_files.id = s.cv_id, "
+                "websearch_to_tsquery('english', :q) query "
+                "WHERE s.document @@ query AND NOT cv_files.is_test_artifact"
+            )
+            select_sql = (
+                "SELECT cv_files.id, cv_files.filename, cv_files.file_type, cv_files.file_size, "
+                "cv_files.uploaded_at, ts_rank(s.document, query) AS rank "
+                f"{match_sql} ORDER BY rank DESC, cv_files.id LIMIT :limit OFFSET :offset"
+            )
+        else:
+            params = {
+                "q": self.build_fts5_query(query), "limit": limit, "offset": offset,
+                "start": self._MATCH_START, "end": self._MATCH_END
+            }
+            match_sql = (
+                f"FROM {self.TABLE_NAME} JOIN cv_files ON cv_files.id = {self.TABLE_NAME}.rowid "
+                f"WHERE {self.TABLE_NAME} MATCH :q AND NOT cv_files.is_test_artifact"
+            )
+            # bm25() is lower-is-better; filename matches weigh double
+            select_sql = (
+                "SELECT cv_files.id, cv_files.filename, cv_files.file_type, cv_files.file_size, "
+                f"cv_files.uploaded_at, -bm25({self.TABLE_NAME}, 2.0, 1.0) AS rank, "
+                f"snippet({self.TABLE_NAME}, 1, :start, :end, '…', 16) AS snippet "
+                f"{match_sql} ORDER BY rank DESC, cv_files.id LIMIT :limit OFFSET :offset"
+            )
+
+        total = db.execute(text(f"SELECT COUNT(*) {match_sql}"), params).scalar() or 0
+        hits = [dict(row) for row in db.execute(text(select_sql), params).mappings().all()]
+
+        if self.is_postgres:
+            # CV content is stored compressed, so headlines are built from the decompressed page
+            contents = dict(db.query(CVFile.id, CVFile.content).filter(CVFile.id.in_([hit["id"] for hit in hits])).all())
+            for hit in hits:
+                hit["snippet"] = db.execute(text(
+                    "SELECT ts_headline('english', :content, websearch_to_tsquery('english', :q), :options)"
+                ), {
+                    "content": contents.get(hit["id"], ""), "q": query,
+                    "options": f"StartSel={self._MATCH_START}, StopSel={self._MATCH_END}, MaxFragments=2"
+                }).scalar()
+
+        for hit in hits:
+            hit["snippet"] = self._render_snippet(hit.get("snippet"))
+        return total, hits
+
+    def _render_snippet(self, snippet: str) -> str:
+        """Escape CV text so snippets are safe to render as HTML, then mark the matches"""
+        if not snippet:
+            return snippet
+        escaped = html.escape(snippet)
+        return escaped.replace(self._MATCH_START, self.SNIPPET_START).replace(self._MATCH_END, self.SNIPPET_END)